@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Cached view of the account balances. One fetch_balance call fills every
+# currency at once; order fills are applied locally so the cache stays
+# usable between refreshes, and a refresh happens once the TTL expires
+# or when a fill cannot be accounted for.
+class AccountState:
+    def __init__(self, exchange, ttl=60):
+        self.exchange = exchange
+        self.ttl = ttl
+        self.free = {}
+        self.used = {}
+        self.updated_at = 0
+        self.lock = asyncio.Lock()
+
+    def is_fresh(self):
+        return time.time() - self.updated_at < self.ttl
+
+    # Force a refresh on the next read
+    def invalidate(self):
+        self.updated_at = 0
+
+    # Reload all balances with a single fetch_balance call
+    async def refresh(self):
+        balance = await self.exchange.fetch_balance()
+        self.free = {currency: amount or 0 for currency, amount in balance.get('free', {}).items()}
+        self.used = {currency: amount or 0 for currency, amount in balance.get('used', {}).items()}
+        self.updated_at = time.time()
+
+    # Free balance of a currency, refreshing first if the cache is stale.
+    # Concurrent callers share a single refresh.
+    async def get_free(self, currency):
+        if not self.is_fresh():
+            async with self.lock:
+                if not self.is_fresh():
+                    await self.refresh()
+        return self.free.get(currency, 0)
+
+    def adjust(self, currency, delta):
+        self.free[currency] = max(0, self.free.get(currency, 0) + delta)
+
+    # Apply an order response to the cached balances
+    def apply_fill(self, pair, order):
+        filled = order.get('filled')
+        cost = order.get('cost')
+        if not filled or cost is None or order.get('side') not in ('buy', 'sell'):
+            logger.info(f"Order for {pair} has no fill details, balances will be refreshed.")
+            self.invalidate()
+            return
+        base, quote = pair.split('/')[0], pair.split('/')[1].split(':')[0]
+        if order['side'] == 'buy':
+            self.adjust(base, filled)
+            self.adjust(quote, -cost)
+        else:
+            self.adjust(base, -filled)
+            self.adjust(quote, cost)
+        fees = order.get('fees') or ([order['fee']] if order.get('fee') else [])
+        for fee in fees:
+            if fee and fee.get('cost') and fee.get('currency'):
+                self.adjust(fee['currency'], -fee['cost'])
@@ -0,0 +1,189 @@
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from candle_store import CandleStore, default_store_path
+from indicators import talib_indicators
+from signals import rule_sets, rule_columns, evaluate_conditions
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+# Defaults matching the live bots
+stop_loss_percentage = 0.05  # 5% stop loss
+take_profit_percentage = 0.1  # 10% take profit
+commission_rate = 0.001  # 0.1%
+
+ohlcv_columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+# Load stored candles as an (n, 6) float64 array from a .npy file or a CSV
+# with timestamp, open, high, low, close and volume columns
+def load_candles(path):
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    df = pd.read_csv(path, usecols=ohlcv_columns)
+    return df[ohlcv_columns].to_numpy(dtype=np.float64)
+
+
+# Milliseconds since the epoch for a date such as 2024-05-01, or None
+def parse_time(text):
+    return None if text is None else pd.Timestamp(text).value // 10**6
+
+
+# Memory-mapped candles of stored pairs in [start, end), all stored pairs
+# of the timeframe when `pairs` is empty
+def load_store_candles(root, timeframe, pairs=None, start=None, end=None):
+    store = CandleStore(root)
+    return [(pair, store.read(pair, timeframe, start, end)) for pair in (pairs or store.pairs(timeframe))]
+
+
+# Buy and sell masks for every bar at once. Buy takes precedence, as in
+# the live evaluators.
+def signal_masks(candles, rules, periods=None):
+    high, low, close, volume = (np.ascontiguousarray(candles[:, i]) for i in (2, 3, 4, 5))
+    columns = rule_columns(rules)
+    values = talib_indicators(high, low, close, volume, periods, columns)
+    values['close'] = close
+    matrix = np.column_stack([values[column] for column in columns])
+    buy = evaluate_conditions(matrix, columns, rules['buy']).all(axis=1)
+    sell = evaluate_conditions(matrix, columns, rules['sell']).all(axis=1) & ~buy
+    return buy, sell
+
+
+# Index of the first bar at or after `start` where `hit` holds, scanning
+# in growing chunks so short trades stay cheap
+def first_hit(hit, start, length):
+    chunk = 64
+    while start < length:
+        end = min(length, start + chunk)
+        found = hit(start, end)
+        if found.any():
+            return start + int(np.argmax(found))
+        start = end
+        chunk *= 2
+    return None
+
+
+# Walk the entries: buy at the signal bar's close, exit at the first bar
+# that touches the stop-loss or take-profit level (the stop wins when a
+# bar touches both, and a gap through a level fills at the open), or on
+# a sell signal when `exit_on_sell` is set. The next entry is taken only
+# after the exit, as the live bot skips pairs it holds.
+def simulate(candles, buy, sell, stop_loss=stop_loss_percentage, take_profit=take_profit_percentage, commission=commission_rate, exit_on_sell=False):
+    open_, high, low, close = (candles[:, i] for i in (1, 2, 3, 4))
+    length = len(close)
+    entries = np.flatnonzero(buy)
+    trades = []
+    next_bar = 0
+    while True:
+        k = np.searchsorted(entries, next_bar)
+        if k >= len(entries):
+            break
+        entry = entries[k]
+        entry_price = close[entry]
+        stop = entry_price * (1 - stop_loss)
+        target = entry_price * (1 + take_profit)
+
+        def hit(start, end):
+            found = (low[start:end] <= stop) | (high[start:end] >= target)
+            if exit_on_sell:
+                found |= sell[start:end]
+            return found
+
+        exit_bar = first_hit(hit, entry + 1, length)
+        if exit_bar is None:
+            exit_bar, exit_price, reason = length - 1, close[-1], 'open'
+        elif low[exit_bar] <= stop:
+            exit_price, reason = min(open_[exit_bar], stop), 'stop-loss'
+        elif high[exit_bar] >= target:
+            exit_price, reason = max(open_[exit_bar], target), 'take-profit'
+        else:
+            exit_price, reason = close[exit_bar], 'sell-signal'
+        net_return = (1 - commission) ** 2 * exit_price / entry_price - 1
+        trades.append((entry, exit_bar, entry_price, exit_price, net_return, reason))
+        next_bar = exit_bar + 1
+    return pd.DataFrame(trades, columns=['entry_bar', 'exit_bar', 'entry_price', 'exit_price', 'return', 'reason'])
+
+
+# Summary statistics for a trade list over `bars` candles
+def trade_statistics(trades, bars):
+    returns = trades['return'].to_numpy()
+    if len(returns) == 0:
+        return {'trades': 0, 'win_rate': 0.0, 'total_return': 0.0, 'avg_return': 0.0, 'max_drawdown': 0.0, 'profit_factor': 0.0, 'exposure': 0.0}
+    equity = np.concatenate(([1.0], np.cumprod(1 + returns)))
+    drawdown = 1 - equity / np.maximum.accumulate(equity)
+    losses = -returns[returns < 0].sum()
+    return {
+        'trades': len(returns),
+        'win_rate': float((returns > 0).mean()),
+        'total_return': float(equity[-1] - 1),
+        'avg_return': float(returns.mean()),
+        'max_drawdown': float(drawdown.max()),
+        'profit_factor': float(returns[returns > 0].sum() / losses) if losses > 0 else float('inf'),
+        'exposure': float((trades['exit_bar'] - trades['entry_bar']).sum() / bars) if bars else 0.0,
+    }
+
+
+# Backtest one candle array with a named strategy
+def backtest(candles, strategy='simplified', rule_params=None, periods=None, stop_loss=stop_loss_percentage, take_profit=take_profit_percentage, commission=commission_rate, exit_on_sell=False):
+    rules = rule_sets[strategy](**(rule_params or {}))
+    buy, sell = signal_masks(candles, rules, periods)
+    trades = simulate(candles, buy, sell, stop_loss, take_profit, commission, exit_on_sell)
+    return trade_statistics(trades, len(candles)), trades
+
+
+# Backtest several stored files and return one row of statistics per file
+def backtest_files(paths, strategy='simplified', **kwargs):
+    rows = []
+    for path in paths:
+        try:
+            statistics, _ = backtest(load_candles(path), strategy, **kwargs)
+        except Exception as e:
+            logger.error(f"Error backtesting {path}: {e}")
+            continue
+        rows.append({'pair': os.path.splitext(os.path.basename(path))[0], **statistics})
+    return pd.DataFrame(rows)
+
+
+# Backtest pairs from the candle store, one row of statistics per pair
+def backtest_store(root, timeframe, pairs=None, start=None, end=None, strategy='simplified', **kwargs):
+    rows = []
+    for pair, candles in load_store_candles(root, timeframe, pairs, start, end):
+        if len(candles) == 0:
+            logger.info(f"No stored candles for {pair} {timeframe}.")
+            continue
+        try:
+            statistics, _ = backtest(candles, strategy, **kwargs)
+        except Exception as e:
+            logger.error(f"Error backtesting {pair}: {e}")
+            continue
+        rows.append({'pair': pair, **statistics})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest the trading strategies on stored OHLCV data")
+    parser.add_argument('paths', nargs='*', help="CSV or .npy candle files, one pair each, or pairs with --store")
+    parser.add_argument('--store', nargs='?', const=default_store_path, help="Read pairs from the candle store (all stored pairs if none are given)")
+    parser.add_argument('--timeframe', default='1m', help="Timeframe read from the candle store")
+    parser.add_argument('--start', help="First date read from the candle store")
+    parser.add_argument('--end', help="Date the candle store read stops before")
+    parser.add_argument('--strategy', choices=sorted(rule_sets), default='simplified')
+    parser.add_argument('--stop-loss', type=float, default=stop_loss_percentage)
+    parser.add_argument('--take-profit', type=float, default=take_profit_percentage)
+    parser.add_argument('--commission', type=float, default=commission_rate)
+    parser.add_argument('--exit-on-sell', action='store_true', help="Also exit on sell signals")
+    args = parser.parse_args()
+    kwargs = {'stop_loss': args.stop_loss, 'take_profit': args.take_profit, 'commission': args.commission, 'exit_on_sell': args.exit_on_sell}
+    if args.store:
+        results = backtest_store(args.store, args.timeframe, args.paths, parse_time(args.start), parse_time(args.end), args.strategy, **kwargs)
+    else:
+        results = backtest_files(args.paths, args.strategy, **kwargs)
+    if results.empty:
+        logger.info("No results.")
+    else:
+        print(results.sort_values('total_return', ascending=False).to_string(index=False))
@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from engine import Strategy, TradingEngine
+from fake_exchange import FakeExchange
+from metrics import metrics
+from scheduler import RequestScheduler
+from signals import rule_sets
+
+logger = logging.getLogger(__name__)
+
+# Parameters
+default_sizes = [100, 500, 2000]  # Synthetic pairs per run
+default_sweeps = 5  # Warm sweeps timed per size
+default_orders = 50  # Buy/sell round trips timed per size
+default_tolerance = 0.1  # Allowed slowdown against a baseline (10%)
+
+
+# Fake exchange for one run, optionally behind the request scheduler
+def create_exchange(pairs, args):
+    exchange = FakeExchange(pairs, args.latency, args.jitter, args.error_rate, args.rate_limit_rate, balance=args.balance, seed=args.seed)
+    if args.scheduled:
+        return RequestScheduler(exchange)
+    return exchange
+
+
+# Engine with every background service that would reach the network or
+# disk turned off, so runs only measure the sweep pipeline
+def create_engine(exchange, args, cache_dir):
+    strategies = [Strategy(name, rule_sets[name](), args.timeframes) for name in args.strategies]
+    return TradingEngine(
+        exchange, strategies,
+        scan_concurrency=args.concurrency,
+        candle_store_path=None,
+        metrics_port=None,
+        metrics_summary_interval=None,
+        screen_pairs=False,
+        markets_cache_path=os.path.join(cache_dir, 'markets.json'),
+        markets_cache_ttl=0,
+        snapshot_path=None)
+
+
+# Total seconds per stage recorded in the metrics registry
+def stage_seconds():
+    stages = {}
+    for (name, labels), histogram in metrics.histograms.items():
+        if name == 'stage_seconds':
+            stage = dict(labels)['stage']
+            stages[stage] = stages.get(stage, 0.0) + histogram.sum
+    return stages
+
+
+def counter_total(name):
+    return sum(value for (counter, _), value in metrics.counters.items() if counter == name)
+
+
+# Peak and retained Python memory of building the engine's state: one
+# cold sweep that seeds every buffer, then one warm sweep
+async def measure_memory(size, args, cache_dir):
+    tracemalloc.start()
+    try:
+        engine = create_engine(create_exchange(size, args), args, cache_dir)
+        pairs = await engine.get_tradeable_pairs()
+        await engine.sweep(pairs)
+        await engine.sweep(pairs)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    await engine.close()
+    return current, peak
+
+
+# Time a cold sweep, `args.sweeps` warm sweeps and the order path for
+# one universe size
+async def measure_throughput(size, args, cache_dir):
+    metrics.reset()
+    exchange = create_exchange(size, args)
+    engine = create_engine(exchange, args, cache_dir)
+    pairs = await engine.get_tradeable_pairs()
+
+    start = time.perf_counter()
+    await engine.sweep(pairs)
+    cold_seconds = time.perf_counter() - start
+
+    metrics.reset()
+    wall = []
+    cpu_start = time.process_time()
+    for _ in range(args.sweeps):
+        start = time.perf_counter()
+        await engine.sweep(pairs)
+        wall.append(time.perf_counter() - start)
+    cpu_seconds = time.process_time() - cpu_start
+    stages = stage_seconds()
+    errors = counter_total('errors_total')
+
+    # Market buy then sell of a small amount, through the engine's order path
+    order_seconds = []
+    for i in range(args.orders):
+        pair = pairs[i % len(pairs)]
+        price = await engine.get_current_price(pair)
+        if not price:  # The price fetch hit an injected error
+            continue
+        amount = args.order_size / price
+        start = time.perf_counter()
+        order = await engine.place_market_order(pair, 'buy', amount)
+        if order:
+            await engine.place_market_order(pair, 'sell', order['filled'])
+        order_seconds.append(time.perf_counter() - start)
+    await engine.close()
+
+    mean = float(np.mean(wall))
+    return {
+        'pairs': size,
+        'cold_sweep_seconds': cold_seconds,
+        'warm_sweep_seconds': mean,
+        'sweeps_per_minute': 60 / mean if mean else float('inf'),
+        'cpu_seconds_per_sweep': cpu_seconds / args.sweeps,
+        'stage_seconds_per_sweep': {stage: seconds / args.sweeps for stage, seconds in sorted(stages.items())},
+        'order_round_trip_p50_ms': float(np.percentile(order_seconds, 50)) * 1000 if order_seconds else None,
+        'order_round_trip_p95_ms': float(np.percentile(order_seconds, 95)) * 1000 if order_seconds else None,
+        'errors': errors,
+        'exchange_calls': dict(getattr(exchange, 'exchange', exchange).calls),
+    }
+
+
+async def run(args):
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for size in args.sizes:
+            result = await measure_throughput(size, args, cache_dir)
+            if args.memory:
+                result['retained_mb'], result['peak_mb'] = [value / 2 ** 20 for value in await measure_memory(size, args, cache_dir)]
+            results.append(result)
+            print_result(result)
+    return results
+
+
+def print_result(result):
+    print(f"{result['pairs']} pairs: {result['sweeps_per_minute']:.1f} sweeps/min "
+          f"(warm {result['warm_sweep_seconds'] * 1000:.1f}ms, cold {result['cold_sweep_seconds'] * 1000:.1f}ms, "
+          f"cpu {result['cpu_seconds_per_sweep'] * 1000:.1f}ms per sweep)")
+    stages = ', '.join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in result['stage_seconds_per_sweep'].items())
+    print(f"  stages per sweep: {stages}")
+    if result['order_round_trip_p50_ms'] is not None:
+        print(f"  order round trip: p50 {result['order_round_trip_p50_ms']:.2f}ms, p95 {result['order_round_trip_p95_ms']:.2f}ms")
+    if 'peak_mb' in result:
+        print(f"  memory: peak {result['peak_mb']:.1f}MB, retained {result['retained_mb']:.1f}MB")
+    print(f"  errors: {result['errors']}, exchange calls: {result['exchange_calls']}")
+
+
+# Sizes whose throughput fell more than `tolerance` below the baseline
+def regressions(results, baseline, tolerance):
+    previous = {result['pairs']: result for result in baseline}
+    failed = []
+    for result in results:
+        reference = previous.get(result['pairs'])
+        if reference and result['sweeps_per_minute'] < reference['sweeps_per_minute'] * (1 - tolerance):
+            failed.append(f"{result['pairs']} pairs: {result['sweeps_per_minute']:.1f} sweeps/min, baseline {reference['sweeps_per_minute']:.1f}")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sweeps and orders against a local fake exchange")
+    parser.add_argument('--sizes', nargs='+', type=int, default=default_sizes, help="Numbers of synthetic pairs")
+    parser.add_argument('--strategies', nargs='+', choices=sorted(rule_sets), default=sorted(rule_sets))
+    parser.add_argument('--timeframes', nargs='+', default=['15m'])
+    parser.add_argument('--sweeps', type=int, default=default_sweeps)
+    parser.add_argument('--orders', type=int, default=default_orders)
+    parser.add_argument('--order-size', type=float, default=10.0, help="Quote amount per benchmark order")
+    parser.add_argument('--balance', type=float, default=1000.0, help="Starting quote balance of the fake account")
+    parser.add_argument('--concurrency', type=int, default=1, help="Pairs fetched at once; stage times are CPU only at 1 with no latency")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds each fake exchange call takes")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random seconds per call")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of calls failing with a network error")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Share of calls failing with a rate limit error")
+    parser.add_argument('--scheduled', action='store_true', help="Route calls through the request scheduler")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="Skip the traced memory run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Fail when sweeps/min drops below this JSON file's results")
+    parser.add_argument('--tolerance', type=float, default=default_tolerance)
+    parser.add_argument('--log-level', default='CRITICAL')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    results = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failed = regressions(results, json.load(f), args.tolerance)
+        for line in failed:
+            print(f"Regression: {line}")
+        if failed:
+            sys.exit(1)
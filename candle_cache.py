@@ -0,0 +1,187 @@
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Most candles the exchange returns per request
+max_fetch_limit = 1000
+
+
+# Fixed-size ring buffer of float64 rows, oldest row overwritten first
+class RingBuffer:
+    def __init__(self, capacity, width):
+        self.data = np.empty((capacity, width), dtype=np.float64)
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+
+    # Most recent row
+    def last(self):
+        return self.data[(self.start + self.size - 1) % self.capacity]
+
+    def append(self, row):
+        index = (self.start + self.size) % self.capacity
+        self.data[index] = row
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def replace_last(self, row):
+        self.data[(self.start + self.size - 1) % self.capacity] = row
+
+    # Oldest-to-newest copy of the last `limit` rows
+    def view(self, limit=None):
+        count = self.size if limit is None else min(limit, self.size)
+        first = (self.start + self.size - count) % self.capacity
+        if first + count <= self.capacity:
+            return self.data[first:first + count].copy()
+        return np.concatenate((self.data[first:], self.data[:first + count - self.capacity]))
+
+
+# Per-(pair, timeframe) OHLCV cache. After the first load only candles at
+# or after the last stored timestamp are requested, so each refresh moves
+# one or two rows instead of the whole window. The stored last candle is
+# the one still open, and it is overwritten when a newer revision arrives.
+# `capacities` overrides the number of candles kept for given timeframes.
+# With a candle store, candles are persisted as they close and an empty
+# buffer is seeded from the store, so a restart only fetches what it
+# missed.
+class CandleCache:
+    def __init__(self, exchange, capacity=100, capacities=None, store=None):
+        self.exchange = exchange
+        self.capacity = capacity
+        self.capacities = capacities or {}
+        self.store = store
+        self.buffers = {}  # (pair, timeframe) -> RingBuffer of [timestamp, open, high, low, close, volume]
+        self.stale = set()  # Keys with a detected gap, refilled on the next update
+
+    # Candles kept for a timeframe
+    def capacity_for(self, timeframe):
+        return self.capacities.get(timeframe, self.capacity)
+
+    def buffer(self, pair, timeframe):
+        key = (pair, timeframe)
+        if key not in self.buffers:
+            self.buffers[key] = RingBuffer(self.capacity_for(timeframe), 6)
+        return self.buffers[key]
+
+    # Timestamp of the newest stored candle, or None when empty
+    def last_timestamp(self, pair, timeframe):
+        buffer = self.buffers.get((pair, timeframe))
+        if not buffer:
+            return None
+        return int(buffer.last()[0])
+
+    def timeframe_ms(self, timeframe):
+        return self.exchange.parse_timeframe(timeframe) * 1000
+
+    # Merge candles into the buffer: older rows are ignored, the stored
+    # open candle is revised in place and newer rows are appended. A row
+    # that skips past the next expected candle marks the key as stale
+    # unless `check_gaps` is off, as for a full reload from the exchange.
+    def apply(self, pair, timeframe, candles, check_gaps=True):
+        buffer = self.buffer(pair, timeframe)
+        step = self.timeframe_ms(timeframe)
+        closed = []  # Rows closed by a newer candle
+        applied = True
+        for candle in candles:
+            timestamp = candle[0]
+            if buffer:
+                last = buffer.last()[0]
+                if timestamp < last:
+                    continue
+                if timestamp == last:
+                    buffer.replace_last(candle)
+                    continue
+                if check_gaps and timestamp > last + step:
+                    self.stale.add((pair, timeframe))
+                    applied = False
+                    break
+                closed.append(buffer.last().copy())
+            buffer.append(candle)
+        if closed and self.store is not None:
+            try:
+                self.store.append(pair, timeframe, closed)
+            except Exception as e:
+                logger.error(f"Error storing candles for {pair} {timeframe}: {e}")
+        return applied
+
+    # Seed an empty buffer with the newest stored candles. Only the run
+    # after the last gap is used (the bot may have been down between
+    # stored candles), so the buffer never holds a hole.
+    def load_stored(self, pair, timeframe):
+        try:
+            candles = self.store.read(pair, timeframe, limit=self.capacity_for(timeframe))
+        except Exception as e:
+            logger.error(f"Error reading stored candles for {pair} {timeframe}: {e}")
+            return
+        if len(candles):
+            gaps = np.flatnonzero(np.diff(candles[:, 0]) != self.timeframe_ms(timeframe))
+            if len(gaps):
+                candles = candles[gaps[-1] + 1:]
+                logger.info(f"Stored candles for {pair} {timeframe} have a gap, seeding the last {len(candles)}.")
+            self.apply(pair, timeframe, candles, check_gaps=False)
+
+    # Load the newest `count` candles, paging forward when more are needed
+    # than one request returns
+    async def fetch_history(self, pair, timeframe, count):
+        if count <= max_fetch_limit:
+            return await self.exchange.fetch_ohlcv(pair, timeframe=timeframe, limit=count)
+        step = self.timeframe_ms(timeframe)
+        since = (int(time.time() * 1000) // step - count + 1) * step
+        ohlcv = []
+        while len(ohlcv) < count:
+            batch = await self.exchange.fetch_ohlcv(pair, timeframe=timeframe, since=since, limit=max_fetch_limit)
+            if not batch:
+                break
+            ohlcv.extend(batch)
+            if len(batch) < max_fetch_limit:
+                break
+            since = batch[-1][0] + step
+        return ohlcv[-count:]
+
+    # Bring the cache up to date over REST
+    async def update(self, pair, timeframe):
+        key = (pair, timeframe)
+        buffer = self.buffer(pair, timeframe)
+        if not buffer and self.store is not None:
+            self.load_stored(pair, timeframe)
+        last = self.last_timestamp(pair, timeframe)
+        step = self.timeframe_ms(timeframe)
+        capacity = self.capacity_for(timeframe)
+        limit = min(capacity, max_fetch_limit)
+        if last is not None and (time.time() * 1000 - last) // step < limit:
+            ohlcv = await self.exchange.fetch_ohlcv(pair, timeframe=timeframe, since=last, limit=limit)
+            if ohlcv and ohlcv[0][0] <= last and self.apply(pair, timeframe, ohlcv):
+                self.stale.discard(key)
+                return buffer
+            logger.info(f"Gap in cached candles for {pair} {timeframe}, reloading.")
+        ohlcv = await self.fetch_history(pair, timeframe, capacity)
+        buffer.clear()
+        self.stale.discard(key)
+        if ohlcv:
+            self.apply(pair, timeframe, ohlcv, check_gaps=False)
+        return buffer
+
+    # Oldest-to-newest array of the last `limit` cached candles
+    def get(self, pair, timeframe, limit=None):
+        buffer = self.buffers.get((pair, timeframe))
+        if buffer is None:
+            return np.empty((0, 6), dtype=np.float64)
+        return buffer.view(limit)
+
+    # Whether at least `limit` fresh candles are cached
+    def has(self, pair, timeframe, limit):
+        key = (pair, timeframe)
+        buffer = self.buffers.get(key)
+        return buffer is not None and len(buffer) >= limit and key not in self.stale
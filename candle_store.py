@@ -0,0 +1,123 @@
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+default_store_path = 'candles'
+
+# Each row is [timestamp, open, high, low, close, volume] as float64
+row_width = 6
+row_bytes = row_width * 8
+
+
+# On-disk candle store: one raw float64 file of (n, 6) rows per
+# (pair, timeframe), sorted by timestamp. New candles are appended to the
+# end of the file; a candle with the newest stored timestamp overwrites
+# that row in place and older candles are skipped. Reads map the file
+# with np.memmap and slice a time range with searchsorted on the
+# timestamp column, so months of 1m history are never loaded whole.
+# Backfills of older history and retention trimming go through
+# compact(), which rewrites the file sorted and deduplicated.
+class CandleStore:
+    def __init__(self, root=default_store_path):
+        self.root = root
+
+    def path(self, pair, timeframe):
+        name = pair.replace('/', '_').replace(':', '-')
+        return os.path.join(self.root, timeframe, f"{name}.f64")
+
+    # Pairs stored for a timeframe
+    def pairs(self, timeframe):
+        directory = os.path.join(self.root, timeframe)
+        if not os.path.isdir(directory):
+            return []
+        names = sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.f64'))
+        return [name.replace('-', ':').replace('_', '/', 1) for name in names]
+
+    # Number of complete rows; a partial row left by a crash is ignored
+    def rows(self, pair, timeframe):
+        try:
+            return os.path.getsize(self.path(pair, timeframe)) // row_bytes
+        except OSError:
+            return 0
+
+    # Read-only (n, 6) view of all stored candles, or an empty array
+    def map(self, pair, timeframe):
+        count = self.rows(pair, timeframe)
+        if count == 0:
+            return np.empty((0, row_width), dtype=np.float64)
+        return np.memmap(self.path(pair, timeframe), dtype=np.float64, mode='r', shape=(count, row_width))
+
+    # Candles with start <= timestamp < end, as a zero-copy view of the
+    # mapped file. `limit` keeps only the newest rows of the range.
+    def read(self, pair, timeframe, start=None, end=None, limit=None):
+        candles = self.map(pair, timeframe)
+        timestamps = candles[:, 0]
+        first = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        last = len(candles) if end is None else int(np.searchsorted(timestamps, end, side='left'))
+        if limit is not None:
+            first = max(first, last - limit)
+        return candles[first:last]
+
+    # Timestamp of the newest stored candle, or None when empty
+    def last_timestamp(self, pair, timeframe):
+        count = self.rows(pair, timeframe)
+        if count == 0:
+            return None
+        with open(self.path(pair, timeframe), 'rb') as f:
+            f.seek((count - 1) * row_bytes)
+            return int(np.frombuffer(f.read(row_bytes), dtype=np.float64)[0])
+
+    # Store timestamp-sorted candles: a candle with the newest stored
+    # timestamp overwrites the last row, newer ones are appended and older
+    # ones skipped. Returns the number of rows written.
+    def append(self, pair, timeframe, candles):
+        candles = np.asarray(candles, dtype=np.float64).reshape(-1, row_width)
+        path = self.path(pair, timeframe)
+        count = self.rows(pair, timeframe)
+        last = self.last_timestamp(pair, timeframe)
+        if last is not None:
+            candles = candles[candles[:, 0] >= last]
+        if len(candles) == 0:
+            return 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'r+b' if count else 'wb') as f:
+            if last is not None and candles[0, 0] == last:
+                f.seek((count - 1) * row_bytes)
+            else:
+                f.seek(count * row_bytes)
+            f.write(np.ascontiguousarray(candles).tobytes())
+            f.truncate()
+        return len(candles)
+
+    # Rewrite a file sorted by timestamp with one row per timestamp (the
+    # latest written wins), merging `extra` rows and dropping rows before
+    # `since`. The new file replaces the old one atomically.
+    def compact(self, pair, timeframe, since=None, extra=None):
+        path = self.path(pair, timeframe)
+        candles = np.array(self.map(pair, timeframe))
+        if extra is not None:
+            candles = np.concatenate((candles, np.asarray(extra, dtype=np.float64).reshape(-1, row_width)))
+        order = np.argsort(candles[:, 0], kind='stable')
+        candles = candles[order]
+        keep = np.ones(len(candles), dtype=bool)
+        keep[:-1] = candles[1:, 0] != candles[:-1, 0]
+        candles = candles[keep]
+        if since is not None:
+            candles = candles[candles[:, 0] >= since]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(candles.tobytes())
+        os.replace(tmp_path, path)
+        return len(candles)
+
+    # Compact every stored file of a timeframe
+    def compact_all(self, timeframe, since=None):
+        for pair in self.pairs(timeframe):
+            try:
+                self.compact(pair, timeframe, since)
+            except Exception as e:
+                logger.error(f"Error compacting {pair} {timeframe}: {e}")
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+ohlcv_columns = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+column_index = {column: i for i, column in enumerate(ohlcv_columns)}
+
+
+# Fill nan gaps in place with the previous value, and leading gaps with
+# the first valid one
+def fill_gaps(values):
+    missing = np.isnan(values)
+    if not missing.any() or missing.all():
+        return values
+    index = np.where(missing, 0, np.arange(len(values)))
+    np.maximum.accumulate(index, out=index)
+    first = int(np.argmax(~missing))
+    index[:first] = first
+    values[:] = values[index]
+    return values
+
+
+# Candles of one pair and timeframe as an (n, 6) float64 block in column
+# order, so each OHLCV column is a contiguous array talib reads without a
+# copy. Indicator columns are attached either whole (`indicators`) or as
+# latest values only (`latest_values`), as the incremental engine gives
+# them. A DataFrame is built only when frame() is called.
+class Candles:
+    def __init__(self, data):
+        self.data = np.array(data, dtype=np.float64, order='F').reshape(-1, len(ohlcv_columns), order='F')
+        for i in range(1, len(ohlcv_columns)):
+            fill_gaps(self.data[:, i])
+        self.indicators = {}
+        self.latest_values = {}
+        self.df = None
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def empty(self):
+        return len(self.data) == 0
+
+    def __contains__(self, column):
+        return column in column_index or column in self.indicators or column in self.latest_values
+
+    # Whole column as an array
+    def __getitem__(self, column):
+        if column in column_index:
+            return self.data[:, column_index[column]]
+        return self.indicators[column]
+
+    # Attach whole indicator columns
+    def update(self, values):
+        self.indicators.update(values)
+        self.df = None
+
+    # Attach latest-only indicator values
+    def set_latest(self, values):
+        self.latest_values.update(values)
+        self.df = None
+
+    # Latest value of one column, nan when it is missing
+    def last(self, column):
+        if self.empty:
+            return np.nan
+        if column in self.latest_values:
+            return self.latest_values[column]
+        if column in self:
+            return self[column][-1]
+        return np.nan
+
+    # Latest values of `columns` as a float64 row
+    def latest(self, columns):
+        return np.array([self.last(column) for column in columns], dtype=np.float64)
+
+    # DataFrame indexed by candle time; latest-only values sit on the last row
+    def frame(self):
+        if self.df is None:
+            df = pd.DataFrame({column: self[column] for column in ohlcv_columns[1:]}, index=pd.to_datetime(self.data[:, 0], unit='ms'))
+            df.index.name = 'timestamp'
+            for column, values in self.indicators.items():
+                df[column] = values
+            if self.latest_values and len(df):
+                for column, value in self.latest_values.items():
+                    df[column] = np.nan
+                    df.iloc[-1, df.columns.get_loc(column)] = value
+            self.df = df
+        return self.df
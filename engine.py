@@ -0,0 +1,479 @@
+import argparse
+import asyncio
+import logging
+import os
+
+import numpy as np
+
+from scanner import scan_pairs
+from exits import ExitEngine, fill_price, filled_amount
+from orders import OrderPipeline
+from stream import MarketStream, binance_stream_url
+from candles import Candles
+from metrics import metrics, MetricsServer
+from candle_cache import CandleCache
+from candle_store import CandleStore, default_store_path
+from scheduler import RequestScheduler, default_weight_limit
+from screener import Screener
+from snapshot import Snapshotter, default_snapshot_path
+from resample import resample, can_resample, base_limit
+from prices import PriceService
+from indicators import IndicatorEngine, talib_indicators, required_indicators
+from account import AccountState
+from markets import PairUniverse, load_markets_cached, default_cache_path
+from signals import rule_sets, rule_columns, latest_matrix, evaluate_batch, evaluate_conditions, actions
+
+logger = logging.getLogger(__name__)
+
+# Parameters
+quote_currency = 'USDT'
+commission_rate = 0.001  # 0.1%
+stop_loss_percentage = 0.05  # 5% stop loss
+take_profit_percentage = 0.1  # 10% take profit
+trailing_stop_percentage = None  # Trail the stop this far below the highest price, None to disable
+native_exit_orders = False  # Also rest OCO/stop-loss orders on the exchange
+scan_concurrency = 10  # Pairs fetched at the same time
+monitor_interval = 60  # Seconds between fallback polls of positions without price updates
+stream_url = binance_stream_url  # Point at replay.py's server to run offline
+candle_limit = 100  # Candles kept per pair and timeframe
+incremental_indicators = True  # Update indicators per new candle instead of recomputing the window
+balance_ttl = 60  # Seconds before cached balances are refetched
+order_retries = 3  # Retries of an order after a network error
+markets_cache_path = default_cache_path  # On-disk market metadata cache
+markets_cache_ttl = 6 * 3600  # Seconds before cached markets are reloaded
+price_refresh_interval = 10  # Seconds between bulk ticker refreshes for open positions
+base_timeframe = '1m'  # Fetched timeframe that higher timeframes are built from
+local_resampling = True  # Build higher timeframes from base candles instead of fetching them
+request_weight_limit = default_weight_limit  # Request weight per minute the scheduler spends
+screen_pairs = True  # Only scan pairs passing the 24h liquidity screen
+screen_interval = 900  # Seconds between liquidity screens
+min_quote_volume = 1000000  # Minimum 24h volume in the quote currency
+max_spread = 0.002  # Maximum bid/ask spread (0.2%)
+min_volatility = 0.01  # Minimum 24h high-low range relative to the last price
+max_screened_pairs = 100  # Most liquid pairs kept by the screen
+candle_store_path = default_store_path  # Directory persisting closed candles, None to disable
+metrics_port = 9108  # Local port serving /metrics, None to disable
+metrics_summary_interval = 300  # Seconds between metrics summaries in the log, None to disable
+snapshot_path = default_snapshot_path  # Runtime state restored on restart, None to disable
+snapshot_interval = 60  # Seconds between snapshots
+
+
+# Snapshot and candle store paths of one named bot, so bots started from
+# the same directory never restore each other's positions or append to
+# the same candle files
+def state_paths(name):
+    return {'snapshot_path': f"snapshot-{name}.pkl.gz", 'candle_store_path': os.path.join(default_store_path, name)}
+
+
+# Create the Binance client from the local config. With `scheduled` the
+# weight-aware request scheduler paces requests instead of ccxt's
+# fixed-rate throttle; `budget` shares its weight budget across processes.
+def create_exchange(scheduled=True, budget=None):
+    import ccxt.async_support as ccxt
+    from config import config
+
+    exchange = ccxt.binance({
+        'apiKey': config.API_KEY,
+        'secret': config.SECRET,
+        'enableRateLimit': not scheduled,
+        'options': {'adjustForTimeDifference': True}
+    })
+    if scheduled:
+        return RequestScheduler(exchange, request_weight_limit, budget=budget)
+    return exchange
+
+
+# A pluggable evaluator: a rule set applied to the latest indicator rows
+# of one or more timeframes. A pair gets 'buy' when any timeframe says
+# buy, otherwise 'sell' when any says sell. The columns its rules read
+# and `periods` declare the indicators it needs.
+class Strategy:
+    def __init__(self, name, rules, timeframes=('15m',), initial_investment=10.0, periods=None):
+        self.name = name
+        self.rules = rules
+        self.columns = rule_columns(rules)
+        self.indicators = required_indicators(self.columns)
+        self.periods = {name: period for name, period in (periods or {}).items() if name in self.indicators}
+        self.timeframes = list(timeframes)
+        self.initial_investment = initial_investment
+
+    # Actions per timeframe for many pairs' {timeframe: Candles} data
+    def evaluate_timeframes(self, datas):
+        signals = {}
+        for timeframe in self.timeframes:
+            frames = [data.get(timeframe) if data else None for data in datas]
+            signals[timeframe] = evaluate_batch(latest_matrix(frames, self.columns), self.columns, self.rules)
+        return signals
+
+    # One combined action per pair, in one vectorized pass per timeframe
+    def evaluate(self, datas):
+        buy = np.zeros(len(datas), dtype=bool)
+        sell = np.zeros(len(datas), dtype=bool)
+        for timeframe_actions in self.evaluate_timeframes(datas).values():
+            buy |= timeframe_actions == 'buy'
+            sell |= timeframe_actions == 'sell'
+        return actions[np.where(buy, 1, np.where(sell, 2, 0))]
+
+    # Which conditions of a side held for one pair's latest values
+    def conditions(self, df, action):
+        conditions = self.rules[action]
+        met = evaluate_conditions(latest_matrix([df], self.columns), self.columns, conditions)[0]
+        return dict(zip([condition[0] for condition in conditions], met))
+
+    # Action for one pair's Candles or DataFrame: (signal, action)
+    def evaluate_frame(self, df):
+        if df.empty:
+            logger.info("DataFrame is empty.")
+            return False, None
+        action = evaluate_batch(latest_matrix([df], self.columns), self.columns, self.rules)[0]
+        if action is None:
+            return False, None
+        logger.info(f"{self.name.capitalize()} {action.capitalize()} signal conditions met: {self.conditions(df, action)}")
+        return True, action
+
+
+# One trading pipeline shared by any number of strategies. Every cycle
+# each pair is fetched once for the union of the strategies' timeframes
+# and its indicators are computed once per timeframe; every strategy then
+# evaluates the same data, and a single decision stage places orders
+# against one balance.
+class TradingEngine:
+    def __init__(self, exchange, strategies, notifier=None, **settings):
+        self.exchange = exchange
+        self.strategies = strategies
+        self.notifier = notifier
+        self.quote_currency = settings.get('quote_currency', quote_currency)
+        self.commission_rate = settings.get('commission_rate', commission_rate)
+        self.scan_concurrency = settings.get('scan_concurrency', scan_concurrency)
+        self.candle_limit = settings.get('candle_limit', candle_limit)
+        self.incremental_indicators = settings.get('incremental_indicators', incremental_indicators)
+        self.markets_cache_path = settings.get('markets_cache_path', markets_cache_path)
+        self.markets_cache_ttl = settings.get('markets_cache_ttl', markets_cache_ttl)
+        self.timeframes = sorted({timeframe for strategy in strategies for timeframe in strategy.timeframes})
+
+        # Timeframes built locally from base candles and those fetched.
+        # Resampled timeframes add no requests, only a deeper base window;
+        # those that would need more than max_base_candles are fetched.
+        self.base_timeframe = settings.get('base_timeframe', base_timeframe)
+        base_ms = self.timeframe_ms(self.base_timeframe)
+        self.resampled = []
+        if settings.get('local_resampling', local_resampling):
+            self.resampled = [timeframe for timeframe in self.timeframes if can_resample(self.timeframe_ms(timeframe), base_ms, self.candle_limit)]
+        self.fetched_timeframes = [timeframe for timeframe in self.timeframes if timeframe not in self.resampled]
+        if self.resampled and self.base_timeframe not in self.fetched_timeframes:
+            self.fetched_timeframes.append(self.base_timeframe)
+        self.base_candles = max([self.candle_limit] + [base_limit(self.timeframe_ms(timeframe), base_ms, self.candle_limit) for timeframe in self.resampled])
+
+        # Incrementally updated candles and shared prices, fed by push
+        # updates with REST fallback
+        store_path = settings.get('candle_store_path', candle_store_path)
+        self.candle_store = CandleStore(store_path) if store_path else None
+        self.candle_cache = CandleCache(exchange, self.candle_limit, {self.base_timeframe: self.base_candles} if self.resampled else None, self.candle_store)
+        self.price_service = PriceService(exchange, settings.get('price_refresh_interval', price_refresh_interval))
+        self.market_stream = MarketStream(exchange, self.candle_cache, self.price_service, settings.get('stream_url', stream_url))
+
+        # Running indicator state per pair and timeframe, limited to the
+        # indicators some strategy reads
+        self.columns = sorted({column for strategy in strategies for column in strategy.columns})
+        self.periods = {}
+        for strategy in strategies:
+            for name, period in strategy.periods.items():
+                if self.periods.setdefault(name, period) != period:
+                    raise ValueError(f"Strategies need different {name} periods: {self.periods[name]} and {period}")
+        self.indicator_engine = IndicatorEngine(self.periods, required_indicators(self.columns))
+
+        # Cached balances, updated locally from order fills
+        self.account_state = AccountState(exchange, settings.get('balance_ttl', balance_ttl))
+
+        # Idempotent, precision-checked order submission
+        self.order_pipeline = OrderPipeline(exchange, settings.get('order_retries', order_retries))
+
+        # Open positions, exited on the first price update past a level
+        self.exit_engine = ExitEngine(
+            self.get_current_price, self.sell_position,
+            settings.get('stop_loss_percentage', stop_loss_percentage),
+            settings.get('take_profit_percentage', take_profit_percentage),
+            settings.get('trailing_stop_percentage', trailing_stop_percentage),
+            settings.get('monitor_interval', monitor_interval),
+            on_exit=self.on_position_exit,
+            on_exit_failed=self.on_exit_failed,
+            exchange=exchange,
+            native_orders=settings.get('native_exit_orders', native_exit_orders))
+        self.price_service.add_listener(self.exit_engine.on_price)
+
+        # Stage latencies and counters, served locally and summarised
+        self.metrics_port = settings.get('metrics_port', metrics_port)
+        self.metrics_summary_interval = settings.get('metrics_summary_interval', metrics_summary_interval)
+        self.metrics_server = MetricsServer(metrics, port=self.metrics_port) if self.metrics_port else None
+
+        # Liquidity screen deciding which pairs each sweep scans
+        self.screen_pairs = settings.get('screen_pairs', screen_pairs)
+        self.screener = Screener(
+            exchange, self.price_service,
+            settings.get('min_quote_volume', min_quote_volume),
+            settings.get('max_spread', max_spread),
+            settings.get('min_volatility', min_volatility),
+            settings.get('max_volatility'),
+            settings.get('max_screened_pairs', max_screened_pairs),
+            settings.get('screen_interval', screen_interval))
+
+        # Periodic snapshot of runtime state for warm restarts
+        path = settings.get('snapshot_path', snapshot_path)
+        self.snapshots = Snapshotter(self, path, settings.get('snapshot_interval', snapshot_interval)) if path else None
+
+    # Send a notification if a notifier is configured
+    def notify(self, message):
+        if self.notifier is not None:
+            self.notifier.notify(message)
+
+    # Fetch all tradeable pairs
+    async def get_tradeable_pairs(self):
+        try:
+            markets = await load_markets_cached(self.exchange, self.markets_cache_path, self.markets_cache_ttl)
+            return PairUniverse(markets).select(quote=self.quote_currency, type='spot', active=True)
+        except Exception as e:
+            logger.error(f"Error loading markets: {e}")
+            return []
+
+    def timeframe_ms(self, timeframe):
+        return self.exchange.parse_timeframe(timeframe) * 1000
+
+    # Candles with indicators for one pair in a timeframe
+    def indicator_candles(self, pair, timeframe, ohlcv):
+        if ohlcv is None or len(ohlcv) == 0:
+            logger.info(f"No data returned for {pair} in {timeframe} timeframe.")
+            return None
+        candles = Candles(ohlcv)
+        with metrics.timer('stage_seconds', stage='indicators'):
+            if self.incremental_indicators:
+                # Only the latest values are kept
+                candles.set_latest(self.indicator_engine.update((pair, timeframe), candles.data))
+            else:
+                candles.update(talib_indicators(candles['high'], candles['low'], candles['close'], candles['volume'], self.periods, self.columns))
+        return candles
+
+    # Fetch historical prices for every timeframe any strategy uses. Only
+    # fetched timeframes reach the exchange; resampled timeframes are
+    # aggregated from the base candles.
+    async def fetch_historical_prices(self, pair):
+        data = {}
+        try:
+            candles = {}
+            with metrics.timer('stage_seconds', stage='fetch'):
+                for timeframe in self.fetched_timeframes:
+                    limit = self.base_candles if timeframe == self.base_timeframe else self.candle_limit
+                    candles[timeframe] = await self.market_stream.fetch_ohlcv(pair, timeframe, limit)
+            for timeframe in self.timeframes:
+                if timeframe in self.resampled:
+                    ohlcv = resample(candles[self.base_timeframe], self.timeframe_ms(timeframe), self.timeframe_ms(self.base_timeframe))
+                else:
+                    ohlcv = candles[timeframe]
+                timeframe_candles = self.indicator_candles(pair, timeframe, ohlcv[-self.candle_limit:])
+                if timeframe_candles is not None:
+                    data[timeframe] = timeframe_candles
+        except Exception as e:
+            logger.error(f"Error fetching historical prices for {pair}: {e}")
+        return data
+
+    # Get balance
+    async def get_balance(self, currency):
+        try:
+            with metrics.timer('stage_seconds', stage='balance'):
+                available_balance = await self.account_state.get_free(currency)
+            logger.info(f"Available balance for {currency}: {available_balance}")
+            return available_balance
+        except Exception as e:
+            logger.error(f"Error fetching balance for {currency}: {e}")
+            return 0
+
+    # Get current price
+    async def get_current_price(self, pair):
+        try:
+            with metrics.timer('stage_seconds', stage='price'):
+                current_price = await self.price_service.get_price(pair)
+            logger.info(f"Current market price for {pair}: {current_price}")
+            return current_price
+        except Exception as e:
+            logger.error(f"Error fetching current price for {pair}: {e}")
+            return None
+
+    # Place market order
+    async def place_market_order(self, pair, side, amount):
+        if amount <= 0:
+            logger.error(f"Invalid amount for {side} order: {amount}")
+            return None
+        try:
+            quote = self.price_service.quotes.get(pair)
+            with metrics.timer('stage_seconds', stage='order'):
+                order = await self.order_pipeline.submit(pair, side, amount, quote['last'] if quote else None)
+            if order is None:
+                metrics.inc('orders_skipped_total', side=side)
+                return None
+            metrics.inc('orders_total', side=side)
+            self.account_state.apply_fill(pair, order)
+            amount = order.get('filled') or order.get('amount') or amount
+            logger.info(f"Market {side} order placed for {pair}: {amount} units at market price.")
+            self.notify(f"Market {side} order placed for {pair}: {amount} units at market price.")
+            return order
+        except Exception as e:
+            logger.error(f"An error occurred placing a {side} order for {pair}: {e}")
+            self.account_state.invalidate()  # The order may have failed on a stale balance
+            return None
+
+    # Convert to USDT
+    async def convert_to_usdt(self, pair):
+        try:
+            asset = pair.split('/')[0]
+            asset_balance = await self.get_balance(asset)
+            if asset_balance > 0:
+                order_result = await self.place_market_order(pair, 'sell', asset_balance)
+                if order_result:
+                    logger.info(f"Converted {asset_balance} of {asset} to USDT")
+                    self.notify(f"Converted {asset_balance} of {asset} to USDT.")
+                    return order_result
+            else:
+                logger.info(f"No {asset} balance to convert to USDT")
+        except Exception as e:
+            logger.error(f"An error occurred converting {pair} to USDT: {e}")
+        return None
+
+    # Sell a position closed by the exit engine
+    async def sell_position(self, pair, amount):
+        return await self.place_market_order(pair, 'sell', amount)
+
+    # Stop refreshing prices for a closed position and report the exit.
+    # Balances are refetched since a native exit order may have filled.
+    def on_position_exit(self, pair, reason, price):
+        self.price_service.unwatch(pair)
+        self.account_state.invalidate()
+        self.notify(f"{reason.capitalize()} triggered for {pair} at {price}.")
+
+    # Report a position the exit engine could not sell
+    def on_exit_failed(self, pair, reason, attempts):
+        self.notify(f"Could not sell {pair} on {reason} after {attempts} attempts; the position needs attention.")
+
+    # Act on one strategy's signal for a pair; `price` is the latest close
+    async def execute(self, strategy, pair, action, price=None):
+        logger.info(f"{strategy.name.capitalize()} {action.capitalize()} signal conditions met for {pair}.")
+        usdt_balance = await self.get_balance(self.quote_currency)
+        if action == 'buy' and usdt_balance > strategy.initial_investment:
+            if price is None or np.isnan(price):
+                price = await self.get_current_price(pair)
+                if price is None:
+                    return
+            amount_to_buy = (usdt_balance * (1 - self.commission_rate)) / price
+            buy_order = await self.place_market_order(pair, 'buy', amount_to_buy)
+            if buy_order:
+                # Market orders carry no limit price; use the fill
+                buy_price = fill_price(buy_order) or await self.get_current_price(pair)
+                amount = filled_amount(buy_order, pair) or amount_to_buy
+                self.exit_engine.open(pair, amount, buy_price, strategy.name)
+                self.price_service.watch(pair)
+        elif action == 'sell':
+            # One order sells the whole free balance
+            await self.convert_to_usdt(pair)
+
+    # Fetch every pair once and let every strategy evaluate the shared
+    # data. Returns (strategy, pair, action, latest close) per signal, in
+    # pair order.
+    async def scan(self, pairs):
+        results = await scan_pairs(pairs, self.fetch_historical_prices, self.scan_concurrency)
+        datas = [data for _, data in results]
+        strategy_actions = []
+        for strategy in self.strategies:
+            with metrics.timer('stage_seconds', stage='evaluate', strategy=strategy.name):
+                strategy_actions.append((strategy, strategy.evaluate(datas)))
+        signals = []
+        for i, (pair, data) in enumerate(results):
+            for strategy, pair_actions in strategy_actions:
+                if pair_actions[i] is not None:
+                    candles = data.get(strategy.timeframes[0]) if data else None
+                    signals.append((strategy, pair, pair_actions[i], candles.last('close') if candles is not None else None))
+        return signals
+
+    # One sweep: scan every unheld pair, then act on the signals in pair
+    # order
+    async def sweep(self, pairs):
+        with metrics.timer('sweep_seconds'):
+            unheld_pairs = [pair for pair in pairs if not self.exit_engine.holds(pair)]
+            for strategy, pair, action, price in await self.scan(unheld_pairs):
+                if not self.exit_engine.holds(pair):
+                    metrics.inc('signals_total', strategy=strategy.name, action=action)
+                    await self.execute(strategy, pair, action, price)
+        metrics.inc('sweeps_total')
+        metrics.inc('pairs_scanned_total', len(unheld_pairs))
+
+    # Main trading logic with stop-loss and take-profit
+    async def advanced_trade(self):
+        pairs = await self.get_tradeable_pairs()
+        if self.snapshots is not None:
+            await self.snapshots.restore()
+            self.snapshots.start()
+        self.market_stream.subscribe(pairs, self.fetched_timeframes)
+        self.market_stream.start()
+        self.price_service.start()
+        self.exit_engine.start()
+        if self.notifier is not None:
+            self.notifier.start()
+        if self.metrics_server is not None:
+            try:
+                await self.metrics_server.start()
+            except Exception as e:
+                logger.error(f"Error starting the metrics server, trading without it: {e}")
+        if self.metrics_summary_interval:
+            metrics.start(self.metrics_summary_interval)
+        if self.screen_pairs:
+            self.screener.universe = pairs
+            if not self.screener.stats:  # Not restored from a recent snapshot
+                try:
+                    await self.screener.refresh()
+                except Exception as e:
+                    logger.error(f"Error screening pairs: {e}")
+            self.screener.start()
+        while True:
+            try:
+                await self.sweep(self.screener.pairs() if self.screen_pairs else pairs)
+                await asyncio.sleep(1)  # Short delay between sweeps
+            except Exception as e:
+                logger.error(f"An error occurred during trading: {e}")
+                await asyncio.sleep(60)  # Wait for 1 minute before retrying
+
+    # Stop background tasks and close the exchange connection
+    async def close(self):
+        await metrics.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        await self.screener.stop()
+        await self.exit_engine.stop()
+        if self.snapshots is not None:
+            await self.snapshots.stop()
+            try:
+                await self.snapshots.save()
+            except Exception as e:
+                logger.error(f"Error saving snapshot: {e}")
+        await self.market_stream.stop()
+        await self.price_service.stop()
+        if self.notifier is not None:
+            await self.notifier.stop()
+        if hasattr(self.exchange, 'close'):
+            await self.exchange.close()
+        logger.info("Exchange connection closed.")
+
+    async def run(self):
+        try:
+            await self.advanced_trade()
+        except Exception as e:
+            logger.error(f"An error occurred in the main trading loop: {e}")
+        finally:
+            await self.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    parser = argparse.ArgumentParser(description="Run several strategies on one shared data pipeline")
+    parser.add_argument('strategies', nargs='+', choices=sorted(rule_sets))
+    parser.add_argument('--timeframes', nargs='+', default=['15m'])
+    parser.add_argument('--initial-investment', type=float, default=10.0)
+    args = parser.parse_args()
+    strategies = [Strategy(name, rule_sets[name](), args.timeframes, args.initial_investment) for name in args.strategies]
+    asyncio.run(TradingEngine(create_exchange(), strategies, **state_paths('-'.join(args.strategies))).run())
@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import time
+
+from ccxt.base.errors import OrderNotFound
+
+from tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Limit price of a native stop-loss below its trigger, so the resting
+# order still fills on a fast drop
+stop_limit_offset = 0.005  # 0.5%
+
+# Backoff between attempts to exit a position whose sell failed
+exit_retry_delay = 5  # Seconds before the first retry, doubled after each failure
+max_exit_retry_delay = 300  # Longest wait between attempts
+max_exit_attempts = 8  # Attempts before the exit is given up and reported
+
+
+# Average fill price of an order: `average`, else cost / filled, else None
+def fill_price(order):
+    if not order:
+        return None
+    if order.get('average'):
+        return order['average']
+    if order.get('cost') and order.get('filled'):
+        return order['cost'] / order['filled']
+    return None
+
+
+# Base amount an order left in the account: the filled amount less any
+# fee charged in the base currency, or None when the order has no fill
+def filled_amount(order, pair):
+    if not order or not order.get('filled'):
+        return None
+    base = pair.split('/')[0]
+    fees = order.get('fees') or ([order['fee']] if order.get('fee') else [])
+    return order['filled'] - sum(fee['cost'] for fee in fees if fee and fee.get('cost') and fee.get('currency') == base)
+
+
+# Stop-loss, take-profit and trailing-stop exits driven by price updates.
+# Each held position keeps its trigger levels (`stop`, `target`), so every
+# update from the price service is a dict lookup and two comparisons, and
+# an exit starts on the first price past a level instead of on the next
+# poll. With `trailing_stop_percentage` the stop follows the highest
+# price seen. A slow poll through `get_price` remains as a fallback for
+# pairs with no updates. With `native_orders` a protective order also
+# rests on the exchange (an OCO on Binance spot, else a stop-loss order)
+# so positions stay protected while the bot is down; it is cancelled
+# before a local exit sells, and if it already executed the position is
+# closed without selling. A failed exit is retried with exponential
+# backoff rather than on every tick, and given up after
+# `max_attempts`, which is reported once through `on_exit_failed`.
+class ExitEngine(BackgroundTask):
+    def __init__(self, get_price, sell, stop_loss_percentage, take_profit_percentage, trailing_stop_percentage=None, interval=60, on_exit=None, exchange=None, native_orders=False,
+                 on_exit_failed=None, retry_delay=exit_retry_delay, max_retry_delay=max_exit_retry_delay, max_attempts=max_exit_attempts):
+        self.get_price = get_price
+        self.sell = sell
+        self.stop_loss_percentage = stop_loss_percentage
+        self.take_profit_percentage = take_profit_percentage
+        self.trailing_stop_percentage = trailing_stop_percentage
+        self.interval = interval
+        self.on_exit = on_exit
+        self.exchange = exchange
+        self.native_orders = native_orders and exchange is not None
+        self.on_exit_failed = on_exit_failed
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.positions = {}
+        self.exiting = {}  # pair -> exit task
+
+    # Whether a position is currently held for the pair
+    def holds(self, pair):
+        return pair in self.positions
+
+    # Register a freshly bought position. Without an entry price the
+    # first price update sets it.
+    def open(self, pair, amount, entry_price, strategy=None):
+        self.positions[pair] = {
+            'pair': pair,
+            'amount': amount,
+            'entry_price': None,
+            'stop': None,
+            'target': None,
+            'peak': None,
+            'native': None,
+            'exit_attempts': 0,
+            'retry_at': 0,
+            'strategy': strategy,
+            'opened_at': time.time(),
+        }
+        if entry_price is not None:
+            self.set_entry(self.positions[pair], entry_price)
+        logger.info(f"Monitoring {pair}: {amount} units, entry price {entry_price}")
+
+    # Set the entry price and the trigger levels derived from it
+    def set_entry(self, position, entry_price):
+        position['entry_price'] = entry_price
+        position['peak'] = entry_price
+        position['stop'] = entry_price * (1 - self.stop_loss_percentage)
+        position['target'] = entry_price * (1 + self.take_profit_percentage) if self.take_profit_percentage else None
+        if self.native_orders:
+            asyncio.ensure_future(self.protect(position))
+
+    # Forget a position without selling it
+    def close(self, pair):
+        return self.positions.pop(pair, None)
+
+    # Price listener: check the pair's levels and start an exit when one
+    # is crossed
+    def on_price(self, pair, price):
+        position = self.positions.get(pair)
+        if position is None or price is None or pair in self.exiting:
+            return
+        if position['entry_price'] is None:
+            self.set_entry(position, price)
+            return
+        if self.trailing_stop_percentage and price > position['peak']:
+            position['peak'] = price
+            position['stop'] = max(position['stop'], price * (1 - self.trailing_stop_percentage))
+        if price <= position['stop']:
+            reason = 'trailing-stop' if position['stop'] > position['entry_price'] * (1 - self.stop_loss_percentage) else 'stop-loss'
+        elif position['target'] is not None and price >= position['target']:
+            reason = 'take-profit'
+        else:
+            return
+        if time.time() < position.get('retry_at', 0):
+            return  # Backing off after a failed exit
+        logger.info(f"{reason.capitalize()} triggered for {pair} at {price}")
+        self.exiting[pair] = asyncio.ensure_future(self.exit(position, reason, price))
+
+    # Sell a triggered position; on failure it stays open and a price
+    # past the level retries once the backoff has passed
+    async def exit(self, position, reason, price):
+        pair = position['pair']
+        try:
+            if position['native'] is not None and not await self.cancel_native(position):
+                logger.info(f"Native exit order for {pair} already executed.")
+            elif await self.sell(pair, position['amount']) is None:
+                await self.exit_failed(position, reason)
+                return
+            self.close(pair)
+            if self.on_exit:
+                self.on_exit(pair, reason, price)
+        except Exception as e:
+            logger.error(f"Error exiting {pair}: {e}")
+            await self.exit_failed(position, reason)
+        finally:
+            self.exiting.pop(pair, None)
+
+    # Schedule the next exit attempt, or give up after `max_attempts`.
+    # The position is protected natively again while it waits.
+    async def exit_failed(self, position, reason):
+        pair = position['pair']
+        attempts = position['exit_attempts'] = position.get('exit_attempts', 0) + 1
+        if attempts >= self.max_attempts:
+            position['retry_at'] = float('inf')
+            logger.error(f"Giving up the {reason} exit of {pair} after {attempts} failed attempts.")
+            if self.on_exit_failed:
+                self.on_exit_failed(pair, reason, attempts)
+        else:
+            delay = min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1))
+            position['retry_at'] = time.time() + delay
+            logger.info(f"Exit of {pair} failed, retrying in {delay:.0f}s.")
+        if self.native_orders and position['native'] is None:
+            await self.protect(position)
+
+    # Rest a protective sell order on the exchange at the position's levels
+    async def protect(self, position):
+        pair = position['pair']
+        exchange = self.exchange
+        try:
+            amount = exchange.amount_to_precision(pair, position['amount'])
+            stop = exchange.price_to_precision(pair, position['stop'])
+            limit = exchange.price_to_precision(pair, position['stop'] * (1 - stop_limit_offset))
+            if exchange.id == 'binance' and position['target'] is not None:
+                response = await exchange.private_post_orderlist_oco({
+                    'symbol': exchange.market(pair)['id'],
+                    'side': 'SELL',
+                    'quantity': amount,
+                    'aboveType': 'LIMIT_MAKER',
+                    'abovePrice': exchange.price_to_precision(pair, position['target']),
+                    'belowType': 'STOP_LOSS_LIMIT',
+                    'belowStopPrice': stop,
+                    'belowPrice': limit,
+                    'belowTimeInForce': 'GTC',
+                })
+                position['native'] = {'kind': 'oco', 'id': response['orderListId']}
+            elif exchange.has.get('createStopLossOrder'):
+                order = await exchange.create_stop_loss_order(pair, 'limit', 'sell', float(amount), float(limit), float(stop))
+                position['native'] = {'kind': 'stop', 'id': order['id']}
+            else:
+                return
+            logger.info(f"Placed native {position['native']['kind']} exit for {pair}: stop {stop}, target {position['target']}")
+        except Exception as e:
+            logger.error(f"Error placing native exit order for {pair}, relying on local triggers: {e}")
+
+    # Cancel the resting protective order. False when it no longer exists
+    # because it executed.
+    async def cancel_native(self, position):
+        pair = position['pair']
+        native = position['native']
+        try:
+            if native['kind'] == 'oco':
+                await self.exchange.private_delete_orderlist({'symbol': self.exchange.market(pair)['id'], 'orderListId': native['id']})
+            else:
+                await self.exchange.cancel_order(native['id'], pair)
+        except OrderNotFound:
+            return False
+        position['native'] = None
+        return True
+
+    # Fallback for pairs without price updates: poll every position
+    # every `interval` seconds
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            for pair in list(self.positions):
+                try:
+                    self.on_price(pair, await self.get_price(pair))
+                except Exception as e:
+                    logger.error(f"Error monitoring {pair}: {e}")
+
+    # Stop the fallback poll and wait for exits in flight
+    async def stop(self):
+        await super().stop()
+        if self.exiting:
+            await asyncio.gather(*self.exiting.values(), return_exceptions=True)
@@ -0,0 +1,180 @@
+import asyncio
+import random
+
+import numpy as np
+from ccxt.async_support.base.exchange import Exchange
+from ccxt.base.decimal_to_precision import TICK_SIZE
+from ccxt.base.errors import InsufficientFunds, NetworkError, OrderNotFound, RateLimitExceeded
+
+minute_ms = 60000
+
+
+# Local stand-in for the Binance client with synthetic USDT pairs. It
+# implements the ccxt calls the bots make on top of ccxt's own base
+# class, so market lookups, precision and timeframe parsing behave as
+# with the real client. Prices are a deterministic function of pair and
+# minute, so repeated and incremental fetches agree. Every call waits
+# `latency` seconds (plus up to `jitter`) and fails with probability
+# `error_rate` (NetworkError) or `rate_limit_rate` (RateLimitExceeded).
+class FakeExchange(Exchange):
+    def __init__(self, pairs=100, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit_rate=0.0, balance=1000.0, seed=0, config={}):
+        super().__init__(config)
+        self.pair_count = pairs
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        rng = np.random.default_rng(seed)
+        self.symbols = [f"C{i:04d}/USDT" for i in range(pairs)]
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.base_price = 10 ** rng.uniform(-3, 3, pairs)
+        self.period = rng.uniform(120, 2880, pairs)
+        self.phase = rng.uniform(0, 2 * np.pi, pairs)
+        self.spread = 10 ** rng.uniform(-4, -2, pairs)
+        self.liquidity = 10 ** rng.uniform(3, 8, pairs)  # Quote volume per day
+        self.balances = {'USDT': balance}
+        self.orders = {}
+        self.calls = {}
+        self.last_response_headers = {}
+
+    def describe(self):
+        return self.deep_extend(super().describe(), {
+            'id': 'fake',
+            'name': 'Fake exchange',
+            'precisionMode': TICK_SIZE,
+            'has': {'fetchOHLCV': True, 'fetchTickers': True, 'fetchCurrencies': False},
+            'timeframes': {timeframe: timeframe for timeframe in ('1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '1d')},
+        })
+
+    # Count, delay and maybe fail one call
+    async def simulate(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        await asyncio.sleep(delay)
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            raise RateLimitExceeded(f"fake {name}: injected rate limit")
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise NetworkError(f"fake {name}: injected network error")
+
+    # Closing price of pair `i` at each minute index
+    def closes(self, i, minutes):
+        minutes = np.asarray(minutes, dtype=np.float64)
+        noise = ((minutes * 2654435761 + i * 40503) % 4294967296) / 4294967296 - 0.5
+        wave = 0.03 * np.sin(2 * np.pi * minutes / self.period[i] + self.phase[i]) + 0.01 * np.sin(2 * np.pi * minutes / 97 + 2 * self.phase[i])
+        return self.base_price[i] * np.exp(wave + 0.004 * noise)
+
+    def last_price(self, symbol):
+        return float(self.closes(self.index[symbol], [self.milliseconds() // minute_ms])[0])
+
+    async def fetch_markets(self, params={}):
+        await self.simulate('load_markets')
+        markets = []
+        for symbol in self.symbols:
+            base = symbol.split('/')[0]
+            precision = 10 ** np.floor(np.log10(self.base_price[self.index[symbol]])) / 10000
+            markets.append({
+                'id': symbol.replace('/', ''), 'symbol': symbol, 'base': base, 'quote': 'USDT', 'baseId': base, 'quoteId': 'USDT',
+                'settle': None, 'settleId': None, 'type': 'spot', 'spot': True, 'margin': False, 'swap': False, 'future': False,
+                'option': False, 'contract': False, 'linear': None, 'inverse': None, 'contractSize': None, 'expiry': None,
+                'expiryDatetime': None, 'strike': None, 'optionType': None, 'active': True, 'taker': 0.001, 'maker': 0.001,
+                'precision': {'amount': 10 ** -max(0, min(8, int(3 + np.log10(self.base_price[self.index[symbol]])))), 'price': float(precision)},
+                'limits': {'amount': {'min': None, 'max': None}, 'cost': {'min': 5.0, 'max': None}, 'price': {'min': None, 'max': None}, 'leverage': {'min': None, 'max': None}},
+                'created': None, 'info': {},
+            })
+        return markets
+
+    async def load_time_difference(self, params={}):
+        await self.simulate('load_time_difference')
+        self.options['timeDifference'] = 0
+        return 0
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        await self.simulate('fetch_ohlcv')
+        i = self.index[symbol]
+        step = self.parse_timeframe(timeframe) * 1000
+        size = step // minute_ms
+        limit = min(limit or 500, 1000)
+        end = self.milliseconds() // step * step + step
+        if since is not None:
+            start = -(-since // step) * step
+            end = min(end, start + limit * step)
+        else:
+            start = end - limit * step
+        if end <= start:
+            return []
+        first = start // minute_ms
+        minutes = np.arange(first - 1, end // minute_ms)
+        closes = self.closes(i, minutes)
+        current = self.milliseconds() // minute_ms
+        closes[minutes > current] = closes[minutes <= current][-1]  # The forming bar stops at the current minute
+        bars = closes[1:].reshape(-1, size)
+        opens = closes[:-1].reshape(-1, size)[:, 0]
+        high = np.maximum(bars.max(axis=1), opens) * (1 + 0.5 * self.spread[i])
+        low = np.minimum(bars.min(axis=1), opens) * (1 - 0.5 * self.spread[i])
+        volume = self.liquidity[i] / 1440 * size / bars[:, -1]
+        timestamps = np.arange(start, end, step, dtype=np.float64)
+        return np.column_stack((timestamps, opens, high, low, bars[:, -1], volume)).tolist()
+
+    def ticker(self, symbol):
+        i = self.index[symbol]
+        now = self.milliseconds() // minute_ms
+        day = self.closes(i, np.arange(now - 1439, now + 1, 15))
+        last = float(day[-1])
+        return {
+            'symbol': symbol, 'timestamp': self.milliseconds(), 'last': last, 'close': last,
+            'bid': last * (1 - float(self.spread[i]) / 2), 'ask': last * (1 + float(self.spread[i]) / 2),
+            'high': float(day.max()), 'low': float(day.min()), 'open': float(day[0]),
+            'baseVolume': self.liquidity[i] / last, 'quoteVolume': float(self.liquidity[i]),
+        }
+
+    async def fetch_ticker(self, symbol, params={}):
+        await self.simulate('fetch_ticker')
+        return self.ticker(symbol)
+
+    async def fetch_tickers(self, symbols=None, params={}):
+        await self.simulate('fetch_tickers')
+        return {symbol: self.ticker(symbol) for symbol in (symbols or self.symbols) if symbol in self.index}
+
+    async def fetch_balance(self, params={}):
+        await self.simulate('fetch_balance')
+        free = dict(self.balances)
+        return {'free': free, 'used': {currency: 0.0 for currency in free}, 'total': dict(free)}
+
+    # Fill a market order at once at the bid or ask, charging the taker
+    # fee in the quote currency
+    async def create_order(self, symbol, type, side, amount, price=None, params={}):
+        await self.simulate('create_order')
+        base, quote = symbol.split('/')
+        ticker = self.ticker(symbol)
+        average = ticker['ask'] if side == 'buy' else ticker['bid']
+        cost = amount * average
+        fee = cost * 0.001
+        if side == 'buy' and self.balances.get(quote, 0) < cost + fee:
+            raise InsufficientFunds(f"fake: {quote} balance too low for {symbol} buy")
+        if side == 'sell' and self.balances.get(base, 0) < amount * (1 - 1e-9):
+            raise InsufficientFunds(f"fake: {base} balance too low for {symbol} sell")
+        sign = 1 if side == 'buy' else -1
+        self.balances[base] = max(0.0, self.balances.get(base, 0) + sign * amount)
+        self.balances[quote] = self.balances.get(quote, 0) - sign * cost - fee
+        order_id = str(len(self.orders) + 1)
+        order = {
+            'id': order_id, 'clientOrderId': params.get('newClientOrderId', f"fake-{order_id}"), 'timestamp': self.milliseconds(),
+            'symbol': symbol, 'type': type, 'side': side, 'amount': amount, 'filled': amount, 'remaining': 0.0,
+            'price': average, 'average': average, 'cost': cost, 'status': 'closed',
+            'fee': {'cost': fee, 'currency': quote}, 'fees': [{'cost': fee, 'currency': quote}],
+        }
+        self.orders[order_id] = order
+        return dict(order)
+
+    async def fetch_order(self, id, symbol=None, params={}):
+        await self.simulate('fetch_order')
+        client_id = params.get('origClientOrderId')
+        for order in self.orders.values():
+            if order['id'] == id or (client_id is not None and order['clientOrderId'] == client_id):
+                return dict(order)
+        raise OrderNotFound(f"fake: order {id or client_id} not found")
+
+    async def close(self):
+        pass
@@ -0,0 +1,82 @@
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+default_cache_path = 'markets_cache.json'
+default_cache_ttl = 6 * 3600  # Seconds
+
+
+# Write markets and currencies to the on-disk cache
+def save_markets(exchange, path=default_cache_path):
+    data = {'saved_at': time.time(), 'markets': exchange.markets, 'currencies': exchange.currencies}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp_path, path)
+
+
+# Read the on-disk cache, or None when it is missing or unreadable
+def read_markets(path=default_cache_path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# Load markets from the on-disk cache while it is younger than `ttl`,
+# otherwise from the exchange, refreshing the cache. If the exchange
+# cannot be reached a stale cache is still used, so startup works offline.
+async def load_markets_cached(exchange, path=default_cache_path, ttl=default_cache_ttl):
+    data = read_markets(path)
+    if data is None or time.time() - data.get('saved_at', 0) >= ttl:
+        try:
+            await exchange.load_markets()
+            save_markets(exchange, path)
+            logger.info(f"Loaded {len(exchange.markets)} markets from the exchange.")
+            return exchange.markets
+        except Exception as e:
+            if data is None:
+                raise
+            logger.error(f"Error loading markets, using stale cache from {path}: {e}")
+    exchange.set_markets(data['markets'], data.get('currencies'))
+    logger.info(f"Loaded {len(exchange.markets)} markets from {path}.")
+    if exchange.options.get('adjustForTimeDifference'):
+        try:
+            await exchange.load_time_difference()
+        except Exception as e:
+            logger.error(f"Error loading exchange time difference: {e}")
+    return exchange.markets
+
+
+# Markets indexed by type, base and quote so pair lists are set lookups
+# instead of string parsing over every symbol
+class PairUniverse:
+    def __init__(self, markets):
+        self.markets = markets
+        self.by_type = {}
+        self.by_base = {}
+        self.by_quote = {}
+        self.active = set()
+        for symbol, market in markets.items():
+            self.by_type.setdefault(market.get('type'), set()).add(symbol)
+            self.by_base.setdefault(market.get('base'), set()).add(symbol)
+            self.by_quote.setdefault(market.get('quote'), set()).add(symbol)
+            if market.get('active') is not False:
+                self.active.add(symbol)
+
+    # Sorted symbols matching every given filter
+    def select(self, quote=None, base=None, type='spot', active=True):
+        symbols = set(self.markets)
+        if type is not None:
+            symbols &= self.by_type.get(type, set())
+        if quote is not None:
+            symbols &= self.by_quote.get(quote, set())
+        if base is not None:
+            symbols &= self.by_base.get(base, set())
+        if active:
+            symbols &= self.active
+        return sorted(symbols)
@@ -0,0 +1,162 @@
+import asyncio
+import bisect
+import logging
+import time
+
+from aiohttp import web
+
+from tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Latency bucket upper bounds in seconds
+default_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prefix of every exported metric name
+namespace = 'bot'
+
+
+# Cumulative latency histogram with fixed buckets
+class Histogram:
+    def __init__(self, buckets=default_buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    # Upper bound of the bucket holding quantile `q`
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float('inf')
+
+
+# Times a block into a histogram and counts the exceptions it raises
+class Timer:
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if kind is not None and not issubclass(kind, asyncio.CancelledError):
+            self.metrics.inc('errors_total', **self.labels)
+        return False
+
+
+# Counters and latency histograms keyed by name and labels, rendered in
+# the Prometheus text format and summarised periodically in the log
+class Metrics(BackgroundTask):
+    def __init__(self, buckets=default_buckets):
+        self.buckets = buckets
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(self.buckets)
+        self.histograms[key].observe(value)
+
+    # Drop every counter and histogram
+    def reset(self):
+        self.counters.clear()
+        self.histograms.clear()
+
+    # with metrics.timer('stage_seconds', stage='fetch'): ...
+    def timer(self, name, **labels):
+        return Timer(self, name, labels)
+
+    def render(self):
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {namespace}_{name} counter")
+                typed.add(name)
+            lines.append(f"{namespace}_{name}{format_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {namespace}_{name} histogram")
+                typed.add(name)
+            total = 0
+            for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                total += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f"{namespace}_{name}_bucket{format_labels(labels + (('le', le),))} {total}")
+            lines.append(f"{namespace}_{name}_sum{format_labels(labels)} {histogram.sum}")
+            lines.append(f"{namespace}_{name}_count{format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    # One line per histogram (count, mean, p50, p95) and per counter
+    def summary(self):
+        lines = []
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            mean = histogram.sum / histogram.count if histogram.count else 0.0
+            lines.append(f"{name}{format_labels(labels)} count={histogram.count} mean={mean * 1000:.1f}ms p50<={histogram.quantile(0.5) * 1000:g}ms p95<={histogram.quantile(0.95) * 1000:g}ms")
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        return '\n'.join(lines)
+
+    # Log the summary every `interval` seconds
+    async def run(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"Metrics summary:\n{self.summary()}")
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels) + '}'
+
+
+# Local HTTP endpoint serving the metrics at /metrics
+class MetricsServer:
+    def __init__(self, metrics, host='127.0.0.1', port=9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.runner = None
+
+    async def handle(self, request):
+        return web.Response(text=self.metrics.render(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    # Start serving in the background
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f"Metrics available at http://{self.host}:{self.port}/metrics")
+
+    # Stop serving
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+# Registry shared by the engine and the request scheduler
+metrics = Metrics()
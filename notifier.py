@@ -0,0 +1,93 @@
+import asyncio
+import inspect
+import logging
+import time
+
+from tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Telegram rejects messages longer than this
+max_message_length = 4096
+
+
+# Background notification queue. notify() never blocks: messages go into
+# a bounded queue drained by one worker, which merges bursts into digest
+# messages and keeps at least `min_interval` seconds between sends. The
+# send callable may be blocking (it runs in a thread) or a coroutine
+# function; its failures are logged and never reach the caller.
+class Notifier(BackgroundTask):
+    def __init__(self, send, max_queue=100, min_interval=1.0, coalesce_delay=2.0, send_timeout=10):
+        self.send = send
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.min_interval = min_interval
+        self.coalesce_delay = coalesce_delay
+        self.send_timeout = send_timeout
+        self.dropped = 0
+        self.pending = []
+        self.last_sent = 0
+
+    # Queue a message; drop it if the queue is full
+    def notify(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    # Move everything queued into `pending`, after waiting briefly for a burst
+    async def collect(self):
+        self.pending.append(await self.queue.get())
+        await asyncio.sleep(self.coalesce_delay)
+        while not self.queue.empty():
+            self.pending.append(self.queue.get_nowait())
+        if self.dropped:
+            self.pending.append(f"({self.dropped} notifications dropped)")
+            self.dropped = 0
+
+    # Join messages into as few texts as the length limit allows
+    def digest(self, messages):
+        texts = []
+        current = ''
+        for message in messages:
+            message = message[:max_message_length]
+            if current and len(current) + 1 + len(message) > max_message_length:
+                texts.append(current)
+                current = message
+            else:
+                current = f"{current}\n{message}" if current else message
+        if current:
+            texts.append(current)
+        return texts
+
+    # Send one text, respecting the rate limit and swallowing errors
+    async def deliver(self, text):
+        wait = self.last_sent + self.min_interval - time.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        try:
+            if inspect.iscoroutinefunction(self.send):
+                await asyncio.wait_for(self.send(text), self.send_timeout)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await asyncio.wait_for(loop.run_in_executor(None, self.send, text), self.send_timeout)
+                if inspect.isawaitable(result):
+                    await asyncio.wait_for(result, self.send_timeout)
+        except Exception as e:
+            logger.error(f"Failed to send notification: {e}")
+        self.last_sent = time.time()
+
+    async def run(self):
+        while True:
+            await self.collect()
+            messages, self.pending = self.pending, []
+            for text in self.digest(messages):
+                await self.deliver(text)
+
+    # Stop the worker, sending whatever is still queued
+    async def stop(self):
+        await super().stop()
+        messages, self.pending = self.pending, []
+        while not self.queue.empty():
+            messages.append(self.queue.get_nowait())
+        for text in self.digest(messages):
+            await self.deliver(text)
@@ -0,0 +1,130 @@
+import asyncio
+import itertools
+import logging
+import random
+import time
+
+from ccxt.base.errors import DuplicateOrderId, InvalidOrder, NetworkError, OrderNotFound
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the client order IDs the bot assigns
+client_id_prefix = 'bot'
+
+
+# Whether an order rejection says the client order ID is already taken.
+# Binance reports it as -2010 "Duplicate order sent.", which ccxt raises
+# as a plain InvalidOrder rather than DuplicateOrderId.
+def is_duplicate(error):
+    return isinstance(error, DuplicateOrderId) or 'Duplicate order' in str(error)
+
+
+# Market order submission. Every order gets its own client order ID
+# (Binance newClientOrderId), so after a timeout or dropped connection
+# the pipeline asks the exchange, several times with backoff, whether the
+# order went through before it sends it again. Binance only keeps client
+# order IDs unique among open orders and a filled market order is no
+# longer open, so a resend after a single miss could fill twice. Transient
+# network errors are retried with jittered exponential backoff, while
+# rejections (insufficient funds, invalid order) are raised at once.
+# Amounts are truncated to the market's precision and checked against
+# its minimum amount and notional from the cached market data, so
+# orders the exchange would reject are never sent.
+class OrderPipeline:
+    def __init__(self, exchange, max_retries=3, base_delay=0.5, max_delay=5.0, lookup_attempts=3):
+        self.exchange = exchange
+        self.max_retries = max_retries
+        self.lookup_attempts = lookup_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.counter = itertools.count()
+
+    # Unique ID within Binance's 36-character limit
+    def client_order_id(self):
+        return f"{client_id_prefix}-{int(time.time() * 1000)}-{next(self.counter) % 100000}"
+
+    # Amount rounded to the market's precision, or None when it falls
+    # below the market's minimum amount or, given a price, its minimum
+    # notional
+    def prepare(self, pair, amount, price=None):
+        market = self.exchange.market(pair)
+        try:
+            amount = float(self.exchange.amount_to_precision(pair, amount))
+        except Exception as e:
+            logger.info(f"Skipping {pair} order: {e}")
+            return None
+        limits = market.get('limits') or {}
+        min_amount = (limits.get('amount') or {}).get('min')
+        min_cost = (limits.get('cost') or {}).get('min')
+        if amount <= 0 or (min_amount and amount < min_amount):
+            logger.info(f"Skipping {pair} order: amount {amount} is below the minimum {min_amount}")
+            return None
+        if price and min_cost and amount * price < min_cost:
+            logger.info(f"Skipping {pair} order: notional {amount * price} is below the minimum {min_cost}")
+            return None
+        return amount
+
+    # The order with a client order ID, or None when the exchange has no
+    # such order
+    async def lookup(self, pair, client_id):
+        try:
+            return await self.exchange.fetch_order(None, pair, {'origClientOrderId': client_id})
+        except OrderNotFound:
+            return None
+
+    # Look an order up `lookup_attempts` times with backoff, since a
+    # placed order can take a moment to show up. None only when the
+    # exchange answered that it has no such order; when no lookup got
+    # through the last network error is raised, as the order may exist.
+    async def find(self, pair, client_id):
+        error = None
+        for attempt in range(self.lookup_attempts):
+            await asyncio.sleep(self.backoff(attempt))
+            try:
+                order = await self.lookup(pair, client_id)
+            except NetworkError as e:
+                logger.warning(f"Looking up order {client_id} for {pair} failed: {e}")
+                error = e
+                continue
+            if order is not None:
+                logger.info(f"Order {client_id} for {pair} was placed before the error.")
+                return order
+            error = None
+        if error is not None:
+            raise error
+        return None
+
+    def backoff(self, attempt):
+        return random.uniform(0.5, 1.0) * min(self.max_delay, self.base_delay * 2 ** attempt)
+
+    # Place a market order, returning the exchange's order or None when
+    # the amount is not tradeable. `price` is an estimate for the
+    # minimum notional check.
+    async def submit(self, pair, side, amount, price=None):
+        amount = self.prepare(pair, amount, price)
+        if amount is None:
+            return None
+        client_id = self.client_order_id()
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.exchange.create_order(pair, 'market', side, amount, None, {'newClientOrderId': client_id})
+            except InvalidOrder as e:
+                if not is_duplicate(e):
+                    raise
+                # An earlier attempt was placed and is still open
+                order = await self.find(pair, client_id)
+                if order is None:
+                    raise
+                return order
+            except NetworkError as e:
+                error = e
+            # The attempt may have reached the exchange
+            order = await self.find(pair, client_id)
+            if order is not None:
+                return order
+            if attempt == self.max_retries:
+                raise error
+            metrics.inc('retries_total', method='create_order')
+            logger.warning(f"Order {client_id} for {pair} failed and was not placed, retrying: {error}")
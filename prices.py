@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+
+from tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+
+# Shared last/bid/ask prices for every consumer. Watched pairs are
+# refreshed together with one fetch_tickers call per interval, push
+# sources such as the market stream can update quotes directly, and a
+# read of a missing or stale quote triggers one bulk refresh that
+# concurrent readers share. Listeners get every new last price as it
+# arrives.
+class PriceService(BackgroundTask):
+    def __init__(self, exchange, interval=10, max_age=30):
+        self.exchange = exchange
+        self.interval = interval
+        self.max_age = max_age
+        self.quotes = {}  # pair -> {'last', 'bid', 'ask', 'timestamp'}
+        self.watched = set()
+        self.listeners = []  # callables (pair, last)
+        self.lock = asyncio.Lock()
+
+    # Keep a pair refreshed on the shared cadence
+    def watch(self, pair):
+        self.watched.add(pair)
+
+    def unwatch(self, pair):
+        self.watched.discard(pair)
+
+    # Call `listener(pair, last)` on every last price update
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    # Record a quote from any source; missing fields keep their last value
+    def update(self, pair, last=None, bid=None, ask=None):
+        quote = self.quotes.setdefault(pair, {'last': None, 'bid': None, 'ask': None, 'timestamp': 0})
+        if last is not None:
+            quote['last'] = last
+        if bid is not None:
+            quote['bid'] = bid
+        if ask is not None:
+            quote['ask'] = ask
+        quote['timestamp'] = time.time()
+        if last is not None:
+            for listener in self.listeners:
+                try:
+                    listener(pair, last)
+                except Exception as e:
+                    logger.error(f"Error in price listener for {pair}: {e}")
+
+    def is_fresh(self, pair):
+        quote = self.quotes.get(pair)
+        return quote is not None and quote['last'] is not None and time.time() - quote['timestamp'] < self.max_age
+
+    # Fetch tickers for the watched pairs plus `extra` in one call
+    async def refresh(self, extra=()):
+        pairs = sorted(self.watched.union(extra))
+        if not pairs:
+            return
+        tickers = await self.exchange.fetch_tickers(pairs)
+        for pair, ticker in tickers.items():
+            self.update(pair, ticker.get('last'), ticker.get('bid'), ticker.get('ask'))
+
+    # Quote for a pair, refreshing in bulk if it is missing or stale
+    async def get_quote(self, pair):
+        if not self.is_fresh(pair):
+            async with self.lock:
+                if not self.is_fresh(pair):
+                    await self.refresh([pair])
+        return self.quotes.get(pair)
+
+    # Last price for a pair
+    async def get_price(self, pair):
+        quote = await self.get_quote(pair)
+        return quote['last'] if quote else None
+
+    # Refresh watched pairs every `interval` seconds
+    async def run(self):
+        while True:
+            try:
+                stale = [pair for pair in self.watched if not self.is_fresh(pair)]
+                if stale:
+                    async with self.lock:
+                        await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing prices: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+from aiohttp import web
+
+from stream import binance_stream_url, subscribe_chunk_size
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# Record raw stream messages to a JSON-lines file for later replay
+async def record(path, streams, duration, url=binance_stream_url):
+    deadline = time.time() + duration
+    count = 0
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(url, heartbeat=30) as ws:
+            for i in range(0, len(streams), subscribe_chunk_size):
+                await ws.send_json({'method': 'SUBSCRIBE', 'params': streams[i:i + subscribe_chunk_size], 'id': i // subscribe_chunk_size + 1})
+            with open(path, 'w') as f:
+                while time.time() < deadline:
+                    try:
+                        msg = await ws.receive(timeout=max(0.1, deadline - time.time()))
+                    except asyncio.TimeoutError:
+                        break
+                    if msg.type != aiohttp.WSMsgType.TEXT:
+                        break
+                    f.write(json.dumps({'t': time.time(), 'msg': msg.data}) + '\n')
+                    count += 1
+    logger.info(f"Recorded {count} messages to {path}")
+    return count
+
+
+# Load recorded messages as (timestamp, raw message) tuples
+def load_recording(path):
+    messages = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                messages.append((entry['t'], entry['msg']))
+    return messages
+
+
+# Local websocket server that plays a recording back to every client.
+# Point MarketStream at its url to run the bot offline.
+class ReplayServer:
+    def __init__(self, messages, speed=1.0, loop=False, host='127.0.0.1', port=8765):
+        self.messages = messages
+        self.speed = speed
+        self.loop = loop
+        self.host = host
+        self.port = port
+        self.runner = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/stream"
+
+    # Acknowledge subscription requests the way Binance does
+    async def acknowledge(self, ws):
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            request = json.loads(msg.data)
+            await ws.send_json({'result': None, 'id': request.get('id')})
+
+    # Stream the recording to one client, keeping the recorded pacing
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        acknowledger = asyncio.create_task(self.acknowledge(ws))
+        try:
+            while True:
+                previous = None
+                for recorded_at, message in self.messages:
+                    if previous is not None and self.speed > 0:
+                        await asyncio.sleep((recorded_at - previous) / self.speed)
+                    previous = recorded_at
+                    if ws.closed:
+                        return ws
+                    await ws.send_str(message)
+                if not self.loop:
+                    break
+        finally:
+            acknowledger.cancel()
+        await ws.close()
+        return ws
+
+    # Start serving in the background
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/stream', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        logger.info(f"Replay server listening on {self.url}")
+
+    # Stop serving
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+async def serve(path, speed, loop, host, port):
+    server = ReplayServer(load_recording(path), speed=speed, loop=loop, host=host, port=port)
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and replay market stream messages")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record_parser = commands.add_parser('record')
+    record_parser.add_argument('path')
+    record_parser.add_argument('streams', nargs='+', help="e.g. btcusdt@kline_15m !miniTicker@arr")
+    record_parser.add_argument('--duration', type=float, default=60)
+    serve_parser = commands.add_parser('serve')
+    serve_parser.add_argument('path')
+    serve_parser.add_argument('--speed', type=float, default=1.0, help="Playback speed, 0 for as fast as possible")
+    serve_parser.add_argument('--loop', action='store_true')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    if args.command == 'record':
+        asyncio.run(record(args.path, args.streams, args.duration))
+    else:
+        asyncio.run(serve(args.path, args.speed, args.loop, args.host, args.port))
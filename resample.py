@@ -0,0 +1,56 @@
+import numpy as np
+
+from candle_cache import max_fetch_limit
+
+# Longest bucket built locally. Weekly and monthly candles are aligned
+# by the exchange in ways epoch-based buckets do not reproduce.
+max_resample_ms = 24 * 3600 * 1000
+
+# Most base candles kept to build a timeframe. Deeper windows cost more
+# paged requests on a cold load and a larger copy and resample every
+# sweep than fetching the timeframe directly.
+max_base_candles = 2 * max_fetch_limit
+
+
+# Whether `limit` bars of `timeframe_ms` can be built from `base_ms` bars
+# within `max_base_candles`
+def can_resample(timeframe_ms, base_ms, limit):
+    if timeframe_ms <= base_ms or timeframe_ms % base_ms != 0 or timeframe_ms > max_resample_ms:
+        return False
+    return base_limit(timeframe_ms, base_ms, limit) <= max_base_candles
+
+
+# Base candles needed for `limit` complete buckets plus a partial one at
+# the start of the window, which is dropped
+def base_limit(timeframe_ms, base_ms, limit):
+    return (limit + 1) * (timeframe_ms // base_ms)
+
+
+# Aggregate an (n, 6) array of [timestamp, open, high, low, close, volume]
+# base candles into `timeframe_ms` bars aligned to multiples of the
+# timeframe, as the exchange aligns them. Each bar takes the first open,
+# the highest high, the lowest low, the last close and the summed volume.
+# A bucket at the start of the window that misses its first base candles
+# is dropped, since its open and extremes would be wrong. The last bucket
+# is kept even if incomplete: like the exchange's newest candle it is the
+# bar still forming and is revised as base candles arrive.
+def resample(candles, timeframe_ms, base_ms):
+    candles = np.asarray(candles, dtype=np.float64)
+    if len(candles) == 0:
+        return np.empty((0, 6), dtype=np.float64)
+    buckets = candles[:, 0] - candles[:, 0] % timeframe_ms
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    if candles[0, 0] != buckets[0]:
+        if len(starts) == 1:
+            return np.empty((0, 6), dtype=np.float64)
+        candles, buckets = candles[starts[1]:], buckets[starts[1]:]
+        starts = starts[1:] - starts[1]
+    ends = np.concatenate((starts[1:], [len(candles)])) - 1
+    bars = np.empty((len(starts), 6), dtype=np.float64)
+    bars[:, 0] = buckets[starts]
+    bars[:, 1] = candles[starts, 1]
+    bars[:, 2] = np.maximum.reduceat(candles[:, 2], starts)
+    bars[:, 3] = np.minimum.reduceat(candles[:, 3], starts)
+    bars[:, 4] = candles[ends, 4]
+    bars[:, 5] = np.add.reduceat(candles[:, 5], starts)
+    return bars
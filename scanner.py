@@ -0,0 +1,27 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Default number of pairs fetched at the same time
+default_concurrency = 10
+
+
+# Fetch one pair while holding a slot of the semaphore
+async def scan_pair(pair, fetch, semaphore):
+    async with semaphore:
+        try:
+            return pair, await fetch(pair)
+        except Exception as e:
+            logger.error(f"Error scanning {pair}: {e}")
+            return pair, None
+
+
+# Fetch all pairs concurrently, at most `concurrency` in flight.
+# Results come back in the same order as `pairs` so they can be
+# evaluated in one batch and acted on one at a time against a single
+# balance.
+async def scan_pairs(pairs, fetch, concurrency=default_concurrency):
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [scan_pair(pair, fetch, semaphore) for pair in pairs]
+    return await asyncio.gather(*tasks)
@@ -0,0 +1,208 @@
+import asyncio
+import contextlib
+import inspect
+import logging
+import multiprocessing
+import random
+import time
+
+from ccxt.base.errors import DDoSProtection, RateLimitExceeded
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Binance spot request weight allowed per minute per IP
+default_weight_limit = 6000
+
+# Request weight of the exchange calls the bots make; anything else
+# counts as `default_weight`
+request_weights = {
+    'fetch_ohlcv': 2,
+    'fetch_ticker': 2,
+    'fetch_balance': 20,
+    'fetch_order': 4,
+    'fetch_my_trades': 20,
+    'fetch_trades': 25,
+    'fetch_time': 1,
+    'load_time_difference': 1,
+    'load_markets': 30,
+    'fetch_markets': 30,
+    'create_order': 1,
+    'create_market_buy_order': 1,
+    'create_market_sell_order': 1,
+    'cancel_order': 1,
+    'create_stop_loss_order': 1,
+    'private_post_orderlist_oco': 1,
+    'private_delete_orderlist': 1,
+}
+default_weight = 10
+
+# Coroutine methods that never reach the exchange
+unscheduled_methods = {'close', 'sleep', 'throttle'}
+
+
+# Weight of one call, for endpoints whose weight depends on arguments
+def request_weight(name, args, kwargs):
+    if name == 'fetch_tickers':
+        symbols = args[0] if args else kwargs.get('symbols')
+        if not symbols:
+            return 80
+        return 2 if len(symbols) <= 20 else 40 if len(symbols) <= 100 else 80
+    if name == 'fetch_open_orders':
+        return 6 if (args[0] if args else kwargs.get('symbol')) else 80
+    if name == 'fetch_order_book':
+        limit = args[1] if len(args) > 1 else kwargs.get('limit') or 100
+        return 5 if limit <= 100 else 25 if limit <= 500 else 50
+    return request_weights.get(name, default_weight)
+
+
+# Order placement and cancellation go ahead of data requests
+def is_order_method(name):
+    return name.startswith(('create_', 'cancel_', 'edit_', 'private_post_orderlist', 'private_delete_orderlist'))
+
+
+# Weight budget of the current window, private to one scheduler
+class Budget:
+    def __init__(self):
+        self.window_start = 0
+        self.used = 0
+        self.blocked_until = 0
+        self.waiting_orders = 0
+        self.lock = contextlib.nullcontext()
+
+
+def shared_field(index):
+    return property(lambda self: self.values[index], lambda self, value: self.values.__setitem__(index, value))
+
+
+# Weight budget in shared memory, so schedulers in several processes
+# spend one limit. Create it before starting the processes and pass it
+# to each process's scheduler.
+class SharedBudget:
+    window_start = shared_field(0)
+    used = shared_field(1)
+    blocked_until = shared_field(2)
+    waiting_orders = shared_field(3)
+
+    def __init__(self, context=multiprocessing):
+        self.values = context.Array('d', 4, lock=False)
+        self.lock = context.Lock()
+
+
+# Request scheduler in front of a ccxt exchange. Every request first
+# takes its weight from the budget of the current minute; data requests
+# leave `order_reserve` of it to orders and wait while an order is
+# queued. Used weight is corrected from Binance's x-mbx-used-weight-1m
+# header after each response. A 429 or 418 response blocks all requests
+# for the Retry-After period, or an exponential backoff with jitter,
+# before the call is retried. Other attributes pass through unchanged,
+# so the scheduler can stand in for the exchange, which should then be
+# created with enableRateLimit off. Schedulers given the same
+# SharedBudget pace their requests together.
+class RequestScheduler:
+    def __init__(self, exchange, weight_limit=default_weight_limit, order_reserve=100, window=60, max_retries=5, base_delay=1.0, max_delay=120.0, budget=None):
+        self.exchange = exchange
+        self.weight_limit = weight_limit
+        self.order_reserve = order_reserve
+        self.window = window
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or Budget()
+        self.requests = 0
+        self.rate_limited = 0
+
+    # Start a new budget when the minute rolls over
+    def roll(self, now):
+        window_start = now - now % self.window
+        if window_start != self.budget.window_start:
+            self.budget.window_start = window_start
+            self.budget.used = 0
+
+    # Wait until the request fits the budget and claim its weight
+    async def acquire(self, weight, priority):
+        budget = self.budget
+        if priority:
+            with budget.lock:
+                budget.waiting_orders += 1
+        try:
+            while True:
+                now = time.time()
+                with budget.lock:
+                    self.roll(now)
+                    wait = budget.blocked_until - now
+                    if wait <= 0:
+                        limit = self.weight_limit if priority else self.weight_limit - self.order_reserve
+                        if budget.used + weight > limit:
+                            wait = budget.window_start + self.window - now
+                        elif priority or not budget.waiting_orders:
+                            budget.used += weight
+                            return
+                        else:
+                            wait = 0.05  # Let the queued order go first
+                await asyncio.sleep(wait)
+        finally:
+            if priority:
+                with budget.lock:
+                    budget.waiting_orders -= 1
+
+    # Response header value, matched case-insensitively
+    def header(self, name):
+        headers = getattr(self.exchange, 'last_response_headers', None) or {}
+        for key, value in headers.items():
+            if key.lower() == name:
+                return value
+        return None
+
+    # Take the exchange's own count of used weight when it is higher
+    def read_headers(self):
+        used = self.header('x-mbx-used-weight-1m')
+        if used is not None:
+            with self.budget.lock:
+                self.roll(time.time())
+                self.budget.used = max(self.budget.used, int(used))
+
+    # Seconds to wait before retry `attempt`
+    def backoff(self, attempt):
+        retry_after = self.header('retry-after')
+        if retry_after is not None:
+            return float(retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0.5, 1.0) * min(self.max_delay, self.base_delay * 2 ** attempt)
+
+    async def call(self, name, method, args, kwargs):
+        weight = request_weight(name, args, kwargs)
+        priority = is_order_method(name)
+        attempt = 0
+        while True:
+            with metrics.timer('queue_seconds', method=name):
+                await self.acquire(weight, priority)
+            self.requests += 1
+            metrics.inc('requests_total', method=name)
+            metrics.inc('request_weight_total', weight)
+            try:
+                with metrics.timer('request_seconds', method=name):
+                    result = await method(*args, **kwargs)
+                self.read_headers()
+                return result
+            except (RateLimitExceeded, DDoSProtection) as e:
+                self.rate_limited += 1
+                metrics.inc('rate_limited_total', method=name)
+                if attempt >= self.max_retries:
+                    raise
+                metrics.inc('retries_total', method=name)
+                delay = self.backoff(attempt)
+                with self.budget.lock:
+                    self.budget.blocked_until = max(self.budget.blocked_until, time.time() + delay)
+                attempt += 1
+                logger.warning(f"Rate limited on {name}, retrying in {delay:.1f}s: {e}")
+
+    def __getattr__(self, name):
+        attribute = getattr(self.exchange, name)
+        if name in unscheduled_methods or not (inspect.iscoroutinefunction(attribute) or (name in request_weights and callable(attribute))):
+            return attribute
+
+        async def scheduled(*args, **kwargs):
+            return await self.call(name, attribute, args, kwargs)
+
+        return scheduled
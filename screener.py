@@ -0,0 +1,85 @@
+import asyncio
+import logging
+
+from tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+
+# Liquidity screen over the pair universe. One fetch_tickers call
+# returns 24h statistics for every symbol; pairs are kept when their
+# quote volume, bid/ask spread and 24h range pass the thresholds, ranked
+# by quote volume and cut to `max_pairs`. The screen refreshes on its
+# own slow cadence so the per-pair candle and indicator work only runs
+# on pairs a small market order can trade. Fetched tickers also refresh
+# the price service when one is given.
+class Screener(BackgroundTask):
+    def __init__(self, exchange, prices=None, min_quote_volume=1000000, max_spread=0.002, min_volatility=0.01, max_volatility=None, max_pairs=100, interval=900):
+        self.exchange = exchange
+        self.prices = prices
+        self.min_quote_volume = min_quote_volume
+        self.max_spread = max_spread
+        self.min_volatility = min_volatility
+        self.max_volatility = max_volatility
+        self.max_pairs = max_pairs
+        self.interval = interval
+        self.universe = []
+        self.selected = []
+        self.stats = {}  # pair -> {'quote_volume', 'spread', 'volatility'}
+
+    # Liquidity figures from one ticker, or None when it lacks the fields
+    def statistics(self, ticker):
+        bid, ask = ticker.get('bid'), ticker.get('ask')
+        high, low, last = ticker.get('high'), ticker.get('low'), ticker.get('last')
+        quote_volume = ticker.get('quoteVolume')
+        if not (bid and ask and last and quote_volume) or high is None or low is None:
+            return None
+        return {
+            'quote_volume': quote_volume,
+            'spread': (ask - bid) / ((ask + bid) / 2),
+            'volatility': (high - low) / last,
+        }
+
+    def passes(self, stats):
+        return (stats['quote_volume'] >= self.min_quote_volume
+                and stats['spread'] <= self.max_spread
+                and stats['volatility'] >= self.min_volatility
+                and (self.max_volatility is None or stats['volatility'] <= self.max_volatility))
+
+    # Pairs of the universe passing the screen, most liquid first
+    def screen(self, tickers):
+        self.stats = {}
+        for pair in self.universe:
+            ticker = tickers.get(pair)
+            stats = self.statistics(ticker) if ticker else None
+            if stats is not None:
+                self.stats[pair] = stats
+        passed = [pair for pair, stats in self.stats.items() if self.passes(stats)]
+        passed.sort(key=lambda pair: self.stats[pair]['quote_volume'], reverse=True)
+        return passed[:self.max_pairs] if self.max_pairs else passed
+
+    # Rescreen the universe from one bulk ticker call
+    async def refresh(self):
+        tickers = await self.exchange.fetch_tickers()
+        if self.prices is not None:
+            for pair in self.universe:
+                ticker = tickers.get(pair)
+                if ticker:
+                    self.prices.update(pair, ticker.get('last'), ticker.get('bid'), ticker.get('ask'))
+        self.selected = self.screen(tickers)
+        logger.info(f"Screened {len(self.universe)} pairs, {len(self.selected)} pass the liquidity filters.")
+        return self.selected
+
+    # Pairs to scan: the last screen, or the whole universe before the
+    # first screen succeeds
+    def pairs(self):
+        return self.selected if self.stats else self.universe
+
+    # Rescreen every `interval` seconds
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error screening pairs: {e}")
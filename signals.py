@@ -0,0 +1,104 @@
+import numpy as np
+
+# Comparison operators allowed in rule conditions
+operators = {'>': np.greater, '<': np.less}
+
+actions = np.array([None, 'buy', 'sell'], dtype=object)
+
+
+# Rules of simplified_evaluate_trading_signals. Each condition is
+# (name, column, operator, operand) where the operand is another column
+# or a number; a side fires when all of its conditions hold.
+def simplified_rules(rsi_buy=40, rsi_sell=60):
+    return {
+        'buy': [
+            ('ema', 'close', '>', 'ema'),  # Price above EMA
+            ('trix', 'trix', '>', 0),  # TRIX positive
+            ('rsi', 'rsi', '<', rsi_buy),  # RSI below 40 (less strict oversold condition)
+            ('macd', 'macd', '>', 'macd_signal'),  # MACD above signal line
+        ],
+        'sell': [
+            ('ema', 'close', '<', 'ema'),  # Price below EMA
+            ('trix', 'trix', '<', 0),  # TRIX negative
+            ('rsi', 'rsi', '>', rsi_sell),  # RSI above 60 (less strict overbought condition)
+            ('macd', 'macd', '<', 'macd_signal'),  # MACD below signal line
+        ],
+    }
+
+
+# Rules of advanced_evaluate_trading_signals
+def advanced_rules(rsi_buy=30, rsi_sell=70, cci_level=100, stoch_buy=20, stoch_sell=80):
+    return {
+        'buy': [
+            ('ema', 'close', '>', 'ema'),  # Price above EMA
+            ('wma', 'close', '>', 'wma'),  # Price above WMA
+            ('trix', 'trix', '>', 0),  # TRIX positive
+            ('close < Lower Band', 'close', '<', 'lower_band'),  # Price below lower Bollinger Band
+            ('rsi', 'rsi', '<', rsi_buy),  # RSI below 30 (oversold)
+            ('macd', 'macd', '>', 'macd_signal'),  # MACD above signal line
+            ('cci', 'cci', '<', -cci_level),  # CCI below -100 (oversold)
+            ('stoch', 'slowk', '<', stoch_buy),  # Stochastic below 20 (oversold)
+            ('stoch', 'slowd', '<', stoch_buy),
+        ],
+        'sell': [
+            ('ema', 'close', '<', 'ema'),  # Price below EMA
+            ('wma', 'close', '<', 'wma'),  # Price below WMA
+            ('trix', 'trix', '<', 0),  # TRIX negative
+            ('close > Upper Band', 'close', '>', 'upper_band'),  # Price above upper Bollinger Band
+            ('rsi', 'rsi', '>', rsi_sell),  # RSI above 70 (overbought)
+            ('macd', 'macd', '<', 'macd_signal'),  # MACD below signal line
+            ('cci', 'cci', '>', cci_level),  # CCI above 100 (overbought)
+            ('stoch', 'slowk', '>', stoch_sell),  # Stochastic above 80 (overbought)
+            ('stoch', 'slowd', '>', stoch_sell),
+        ],
+    }
+
+
+# Columns a rule set reads, in a stable order
+def rule_columns(rules):
+    columns = []
+    for conditions in rules.values():
+        for _, column, _, operand in conditions:
+            for name in (column, operand):
+                if isinstance(name, str) and name not in columns:
+                    columns.append(name)
+    return columns
+
+
+# Stack the latest row of each DataFrame or Candles into a (pairs,
+# columns) matrix.
+# Empty frames and missing columns become NaN, which never satisfy a rule.
+def latest_matrix(frames, columns):
+    matrix = np.full((len(frames), len(columns)), np.nan)
+    for i, df in enumerate(frames):
+        if df is None or df.empty:
+            continue
+        if hasattr(df, 'latest'):
+            matrix[i] = df.latest(columns)
+        else:
+            matrix[i] = df.iloc[-1].reindex(columns).to_numpy(dtype=np.float64)
+    return matrix
+
+
+# Evaluate each condition for every row at once; returns a boolean
+# (rows, conditions) array
+def evaluate_conditions(matrix, columns, conditions):
+    index = {column: j for j, column in enumerate(columns)}
+    results = np.empty((matrix.shape[0], len(conditions)), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        for k, (_, column, operator, operand) in enumerate(conditions):
+            rhs = matrix[:, index[operand]] if isinstance(operand, str) else operand
+            results[:, k] = operators[operator](matrix[:, index[column]], rhs)
+    return results
+
+
+# Per-row actions ('buy', 'sell' or None) for a rule set, buy taking
+# precedence when both sides hold
+def evaluate_batch(matrix, columns, rules):
+    buy = evaluate_conditions(matrix, columns, rules['buy']).all(axis=1)
+    sell = evaluate_conditions(matrix, columns, rules['sell']).all(axis=1)
+    return actions[np.where(buy, 1, np.where(sell, 2, 0))]
+
+
+# Rule set builders by strategy name
+rule_sets = {'simplified': simplified_rules, 'advanced': advanced_rules}
@@ -0,0 +1,162 @@
+import asyncio
+import gzip
+import logging
+import os
+import pickle
+import time
+
+from tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+default_snapshot_path = 'snapshot.pkl.gz'
+
+# Bumped when the snapshot layout changes; older snapshots are ignored
+snapshot_version = 2
+
+# A restored position is shrunk to the balance when less than this share
+# of it is left
+reconcile_tolerance = 0.01  # 1%
+
+
+# Periodic snapshot of an engine's runtime state: open positions with
+# their exit levels, running indicator state, the last liquidity screen,
+# and candle buffers when no candle store already persists them. Market
+# metadata has its own on-disk cache. The state is pickled on the event
+# loop, so it is consistent, and compressed and written in a thread;
+# the file is replaced atomically. restore() loads the snapshot at
+# startup and reconciles positions against the account's balances, so
+# held positions stay protected and indicators resume without
+# replaying history.
+class Snapshotter(BackgroundTask):
+    def __init__(self, engine, path=default_snapshot_path, interval=60):
+        self.engine = engine
+        self.path = path
+        self.interval = interval
+        self.restored = False  # Nothing is saved before restore() ran
+
+    # Indicator parameters the saved state was built with
+    def indicator_config(self):
+        indicator_engine = self.engine.indicator_engine
+        return sorted((indicator_engine.periods or {}).items()), sorted(indicator_engine.indicators or [])
+
+    def collect(self):
+        engine = self.engine
+        candles = {}
+        if engine.candle_store is None:
+            candles = {key: buffer.view() for key, buffer in engine.candle_cache.buffers.items() if buffer}
+        return {
+            'version': snapshot_version,
+            'saved_at': time.time(),
+            'positions': engine.exit_engine.positions,
+            'indicator_config': self.indicator_config(),
+            'indicators': engine.indicator_engine.states,
+            'candles': candles,
+            'screener': {'selected': engine.screener.selected, 'stats': engine.screener.stats},
+        }
+
+    def write(self, data):
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, 'wb', compresslevel=1) as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    async def save(self):
+        if not self.restored:
+            return
+        start = time.perf_counter()
+        data = pickle.dumps(self.collect(), protocol=pickle.HIGHEST_PROTOCOL)
+        await asyncio.get_running_loop().run_in_executor(None, self.write, data)
+        logger.info(f"Saved snapshot to {self.path}: {len(data) / 2 ** 20:.1f}MB in {time.perf_counter() - start:.2f}s")
+
+    # The saved state, or None when it is missing, unreadable or outdated
+    def load(self):
+        try:
+            with gzip.open(self.path, 'rb') as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading snapshot {self.path}: {e}")
+            return None
+        if not isinstance(state, dict) or state.get('version') != snapshot_version:
+            logger.info(f"Ignoring snapshot {self.path} from another version.")
+            return None
+        return state
+
+    # Restore the saved state into the engine, then reconcile positions
+    async def restore(self):
+        engine = self.engine
+        state = await asyncio.get_running_loop().run_in_executor(None, self.load)
+        self.restored = True
+        if state is None:
+            return
+        now = time.time()
+        for pair, position in state['positions'].items():
+            engine.exit_engine.positions[pair] = position
+            engine.price_service.watch(pair)
+
+        for (pair, timeframe), candles in state['candles'].items():
+            if timeframe in engine.fetched_timeframes:
+                engine.candle_cache.apply(pair, timeframe, candles[-engine.candle_cache.capacity_for(timeframe):], check_gaps=False)
+
+        # Indicator state is only kept while the candles fetched on the
+        # next update still reach back to its last candle
+        indicators = 0
+        if state['indicator_config'] == self.indicator_config():
+            for key, entry in state['indicators'].items():
+                if entry['timestamp'] is not None and now * 1000 - entry['timestamp'] < (engine.candle_limit - 1) * engine.timeframe_ms(key[1]):
+                    engine.indicator_engine.states[key] = entry
+                    indicators += 1
+
+        if now - state['saved_at'] < engine.screener.interval:
+            engine.screener.selected = state['screener']['selected']
+            engine.screener.stats = state['screener']['stats']
+        logger.info(f"Restored snapshot from {now - state['saved_at']:.0f}s ago: {len(state['positions'])} positions, "
+                    f"{indicators} indicator states, {len(state['candles'])} candle buffers.")
+        await self.reconcile()
+
+    # Check restored positions against the account: a position whose base
+    # balance is gone (an exit order filled while the bot was down) is
+    # dropped, and one with less left is shrunk to the balance
+    async def reconcile(self):
+        engine = self.engine
+        positions = engine.exit_engine.positions
+        if not positions:
+            return
+        try:
+            await engine.account_state.refresh()
+        except Exception as e:
+            logger.error(f"Error fetching balances, keeping restored positions unchecked: {e}")
+            return
+        for pair, position in list(positions.items()):
+            base = pair.split('/')[0]
+            held = engine.account_state.free.get(base, 0) + engine.account_state.used.get(base, 0)
+            market = engine.exchange.markets.get(pair) if engine.exchange.markets else None
+            min_cost = ((market or {}).get('limits') or {}).get('cost', {}).get('min') or 0
+            # Without an entry price the dust check uses the current price,
+            # and is skipped when that is unavailable too
+            price = position['entry_price']
+            if price is None and held > 0 and min_cost:
+                try:
+                    price = await engine.price_service.get_price(pair)
+                except Exception as e:
+                    logger.error(f"Error fetching the price of {pair}, keeping the position: {e}")
+            if held <= 0 or (price is not None and held * price < min_cost):
+                engine.exit_engine.close(pair)
+                engine.price_service.unwatch(pair)
+                logger.info(f"Position in {pair} was closed while the bot was down.")
+                engine.notify(f"Position in {pair} was closed while the bot was down.")
+            elif held < position['amount'] * (1 - reconcile_tolerance):
+                logger.info(f"Position in {pair} shrunk from {position['amount']} to {held} while the bot was down.")
+                position['amount'] = held
+        logger.info(f"Resuming {len(positions)} positions: {', '.join(sorted(positions))}")
+
+    # Save every `interval` seconds
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.save()
+            except Exception as e:
+                logger.error(f"Error saving snapshot: {e}")
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+
+from tasks import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+# Binance combined-stream endpoint
+binance_stream_url = 'wss://stream.binance.com:9443/stream'
+
+# Binance caps a single SUBSCRIBE request, so streams are sent in chunks
+subscribe_chunk_size = 200
+
+
+# Keep candles and last prices up to date from Binance push updates.
+# History for a pair is seeded once over REST into the candle cache;
+# after that kline messages extend it in place, and last prices go to
+# the price service. Whenever the stream is down or stale, candle reads
+# fall back to incremental REST updates of the cache and the price
+# service's own bulk refresh takes over, so callers always get data.
+class MarketStream(BackgroundTask):
+    def __init__(self, exchange, cache, prices, url=binance_stream_url, stale_after=30, reconnect_delay=5):
+        self.exchange = exchange
+        self.cache = cache
+        self.prices = prices
+        self.url = url
+        self.stale_after = stale_after
+        self.reconnect_delay = reconnect_delay
+        self.pairs_by_id = {}  # lowercase market id -> pair
+        self.pairs = set()
+        self.timeframes = set()
+        self.connected = False
+        self.last_message = 0
+
+    # Register pairs and timeframes to follow
+    def subscribe(self, pairs, timeframes):
+        for pair in pairs:
+            try:
+                market_id = self.exchange.market(pair)['id']
+            except Exception:
+                continue
+            self.pairs_by_id[market_id.lower()] = pair
+            self.pairs.add(pair)
+        self.timeframes.update(timeframes)
+
+    # Stream names for the current subscription
+    def stream_names(self):
+        names = ['!miniTicker@arr']
+        for market_id in self.pairs_by_id:
+            for timeframe in sorted(self.timeframes):
+                names.append(f"{market_id}@kline_{timeframe}")
+        return names
+
+    # Whether push data is fresh enough to serve reads
+    def is_live(self):
+        return self.connected and time.time() - self.last_message < self.stale_after
+
+    # Whether the stream keeps candles for the pair and timeframe up to date
+    def follows(self, pair, timeframe):
+        return pair in self.pairs and timeframe in self.timeframes
+
+    # Apply one kline update to the candle buffer
+    def apply_kline(self, kline):
+        pair = self.pairs_by_id.get(kline['s'].lower())
+        if pair is None:
+            return
+        candle = [kline['t'], float(kline['o']), float(kline['h']), float(kline['l']), float(kline['c']), float(kline['v'])]
+        if self.cache.last_timestamp(pair, kline['i']) is not None:  # Seeded over REST
+            self.cache.apply(pair, kline['i'], [candle])
+        self.prices.update(pair, last=candle[4])
+
+    # Apply one mini-ticker update to the price table
+    def apply_ticker(self, ticker):
+        pair = self.pairs_by_id.get(ticker['s'].lower())
+        if pair is not None:
+            self.prices.update(pair, last=float(ticker['c']))
+
+    # Dispatch a raw stream message
+    def handle(self, message):
+        payload = json.loads(message)
+        data = payload.get('data', payload)
+        if isinstance(data, list):
+            for ticker in data:
+                self.apply_ticker(ticker)
+        elif data.get('e') == 'kline':
+            self.apply_kline(data['k'])
+        elif data.get('e') == '24hrMiniTicker':
+            self.apply_ticker(data)
+        else:
+            return  # Subscription replies and unknown events
+        self.last_message = time.time()
+
+    # Open one websocket session and consume it until it drops
+    async def connect(self):
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(self.url, heartbeat=30) as ws:
+                names = self.stream_names()
+                for i in range(0, len(names), subscribe_chunk_size):
+                    await ws.send_json({'method': 'SUBSCRIBE', 'params': names[i:i + subscribe_chunk_size], 'id': i // subscribe_chunk_size + 1})
+                self.connected = True
+                logger.info(f"Market stream connected to {self.url} with {len(names)} streams")
+                async for msg in ws:
+                    if msg.type == aiohttp.WSMsgType.TEXT:
+                        self.handle(msg.data)
+                    elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                        break
+
+    # Keep the stream connected, reconnecting after failures
+    async def run(self):
+        while True:
+            try:
+                await self.connect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Market stream error: {e}")
+            finally:
+                self.connected = False
+            logger.info(f"Market stream disconnected, falling back to REST; reconnecting in {self.reconnect_delay}s")
+            await asyncio.sleep(self.reconnect_delay)
+
+    # Candles for a pair, from the stream-fed cache when live, otherwise
+    # after an incremental REST update of the cache
+    async def fetch_ohlcv(self, pair, timeframe, limit=None):
+        limit = limit or self.cache.capacity_for(timeframe)
+        if not (self.is_live() and self.follows(pair, timeframe) and self.cache.has(pair, timeframe, limit)):
+            await self.cache.update(pair, timeframe)
+        return self.cache.get(pair, timeframe, limit)
@@ -0,0 +1,178 @@
+import argparse
+import inspect
+import itertools
+import logging
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import backtest, load_candles, load_store_candles, parse_time
+from candle_store import default_store_path
+from indicators import default_periods
+from signals import rule_sets
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+logger = logging.getLogger(__name__)
+
+# Parameters passed straight to backtest()
+backtest_parameters = ('stop_loss', 'take_profit', 'commission', 'exit_on_sell')
+
+# Candle views of the shared block, set in each worker process
+worker_candles = None
+worker_memory = None
+
+
+# Copy all pairs' candles into one shared memory block once. Workers map
+# the block read-only instead of receiving their own copy.
+def share_candles(arrays):
+    offsets = np.cumsum([0] + [len(array) for array in arrays])
+    memory = shared_memory.SharedMemory(create=True, size=max(1, int(offsets[-1]) * 6 * 8))
+    block = np.ndarray((int(offsets[-1]), 6), dtype=np.float64, buffer=memory.buf)
+    for array, start in zip(arrays, offsets):
+        block[start:start + len(array)] = array
+    return memory, offsets
+
+
+# Worker initializer: attach to the shared block and slice per-pair views
+def attach_candles(name, offsets):
+    global worker_candles, worker_memory
+    worker_memory = shared_memory.SharedMemory(name=name)
+    block = np.ndarray((int(offsets[-1]), 6), dtype=np.float64, buffer=worker_memory.buf)
+    block.flags.writeable = False
+    worker_candles = [block[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+# Split a flat parameter dict into backtest() keyword arguments
+def backtest_arguments(strategy, params):
+    rule_names = inspect.signature(rule_sets[strategy]).parameters
+    kwargs = {name: params[name] for name in backtest_parameters if name in params}
+    kwargs['rule_params'] = {name: value for name, value in params.items() if name in rule_names}
+    kwargs['periods'] = {name: value for name, value in params.items() if name in default_periods}
+    unknown = set(params) - set(backtest_parameters) - set(rule_names) - set(default_periods)
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(sorted(unknown))}")
+    return kwargs
+
+
+# Backtest one parameter set on the given pairs and aggregate the results
+def evaluate(strategy, params, pair_indices):
+    kwargs = backtest_arguments(strategy, params)
+    rows = [backtest(worker_candles[i], strategy, **kwargs)[0] for i in pair_indices]
+    returns = np.array([row['total_return'] for row in rows])
+    return {
+        **params,
+        'pairs': len(rows),
+        'trades': int(sum(row['trades'] for row in rows)),
+        'mean_return': float(returns.mean()) if len(rows) else 0.0,
+        'median_return': float(np.median(returns)) if len(rows) else 0.0,
+        'win_rate': float(np.mean([row['win_rate'] for row in rows])) if rows else 0.0,
+        'max_drawdown': float(max((row['max_drawdown'] for row in rows), default=0.0)),
+    }
+
+
+# A grid with repeated values listed once, so no config is evaluated twice
+def distinct_grid(grid):
+    return {name: list(dict.fromkeys(values)) for name, values in grid.items()}
+
+
+# Every combination of a {name: [values]} grid
+def grid_configs(grid):
+    grid = distinct_grid(grid)
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+# `samples` distinct random combinations drawn from a grid, or all of them
+# when the grid has no more. Combinations are sampled by index without
+# replacement, so a large grid is never built in full.
+def random_configs(grid, samples, seed=0):
+    grid = distinct_grid(grid)
+    sizes = [len(values) for values in grid.values()]
+    total = math.prod(sizes)
+    if samples >= total:
+        return grid_configs(grid)
+    rng = random.Random(seed)
+    configs = []
+    for index in rng.sample(range(total), samples):
+        positions = []
+        for size in reversed(sizes):
+            index, position = divmod(index, size)
+            positions.append(position)
+        configs.append({name: values[position] for (name, values), position in zip(grid.items(), reversed(positions))})
+    return configs
+
+
+# Run a parameter search across a process pool sharing the candle data.
+# 'grid' and 'random' evaluate every config on all pairs; 'halving'
+# starts all configs on a small subset of pairs and keeps the best
+# 1/eta at each rung while the pair subset grows by eta.
+def run_sweep(arrays, strategy, configs, workers=None, search='grid', eta=3, metric='mean_return'):
+    memory, offsets = share_candles(arrays)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=attach_candles, initargs=(memory.name, offsets)) as pool:
+            pairs = list(range(len(arrays)))
+            if search == 'halving':
+                rungs = int(math.log(max(1, len(configs)), eta)) if len(configs) > 1 else 0
+                count = max(1, len(pairs) // eta ** rungs)
+            else:
+                count = len(pairs)
+            while True:
+                futures = [pool.submit(evaluate, strategy, params, pairs[:count]) for params in configs]
+                results = pd.DataFrame([future.result() for future in futures])
+                results = results.sort_values(metric, ascending=False, ignore_index=True)
+                logger.info(f"Evaluated {len(configs)} configs on {count} pairs.")
+                if search != 'halving' or count >= len(pairs) or len(configs) <= 1:
+                    return results
+                keep = max(1, len(configs) // eta)
+                configs = [{name: row[name] for name in configs[0]} for _, row in results.head(keep).iterrows()]
+                count = min(len(pairs), count * eta)
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+# Parse "name=v1,v2,..." into a grid entry; "a:b:c" values become tuples
+def parse_grid_entry(text):
+    name, values = text.split('=', 1)
+
+    def parse(value):
+        if ':' in value:
+            return tuple(int(part) for part in value.split(':'))
+        number = float(value)
+        return int(number) if number.is_integer() and '.' not in value else number
+
+    return name, [parse(value) for value in values.split(',')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep strategy parameters across CPU cores")
+    parser.add_argument('paths', nargs='*', help="CSV or .npy candle files, one pair each, or pairs with --store")
+    parser.add_argument('--store', nargs='?', const=default_store_path, help="Read pairs from the candle store (all stored pairs if none are given)")
+    parser.add_argument('--timeframe', default='1m', help="Timeframe read from the candle store")
+    parser.add_argument('--start', help="First date read from the candle store")
+    parser.add_argument('--end', help="Date the candle store read stops before")
+    parser.add_argument('--strategy', choices=sorted(rule_sets), default='simplified')
+    parser.add_argument('--grid', nargs='+', required=True, help="e.g. rsi_buy=30,35,40 stop_loss=0.03,0.05 macd=12:26:9,8:21:5")
+    parser.add_argument('--search', choices=['grid', 'random', 'halving'], default='grid')
+    parser.add_argument('--samples', type=int, default=50, help="Configs drawn for random and halving searches")
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--metric', default='mean_return')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--out', help="Write the ranked table to this CSV file")
+    args = parser.parse_args()
+
+    grid = dict(parse_grid_entry(entry) for entry in args.grid)
+    configs = grid_configs(grid) if args.search == 'grid' else random_configs(grid, args.samples)
+    if args.store:
+        arrays = [candles for _, candles in load_store_candles(args.store, args.timeframe, args.paths, parse_time(args.start), parse_time(args.end)) if len(candles)]
+    else:
+        arrays = [np.asarray(load_candles(path), dtype=np.float64) for path in args.paths]
+    results = run_sweep(arrays, args.strategy, configs, args.workers, args.search, args.eta, args.metric)
+    print(results.to_string(index=False))
+    if args.out:
+        results.to_csv(args.out, index=False)
@@ -0,0 +1,29 @@
+import asyncio
+
+
+# Mixin for services that run one background coroutine, their run().
+# start() creates the task unless it is already running, and stop()
+# cancels it and waits for it to finish. Services with more to shut down
+# extend stop() and call it first.
+class BackgroundTask:
+    task = None
+
+    # Start run(*args) as the service's task
+    def start(self, *args):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run(*args))
+        return self.task
+
+    # Cancel the task and wait for it to end. The cancellation is repeated
+    # until the task is done, since asyncio.wait_for before Python 3.12
+    # swallows one that arrives as the awaited result completes.
+    async def stop(self):
+        if self.task is not None:
+            while not self.task.done():
+                self.task.cancel()
+                await asyncio.wait([self.task], timeout=1)
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from notifier import Notifier, max_message_length
+
+
+# Stand-in for the Telegram bot that records what it is sent. Its first
+# `failures` sends raise, or with `hang` sleep that long first.
+class StubBot:
+    def __init__(self, failures=0, hang=0.0):
+        self.failures = failures
+        self.hang = hang
+        self.calls = 0
+        self.sent = []  # (monotonic time, text)
+
+    def send(self, text):
+        self.calls += 1
+        if self.calls <= self.failures:
+            if self.hang:
+                time.sleep(self.hang)
+            else:
+                raise RuntimeError("stub send failed")
+        self.sent.append((time.monotonic(), text))
+
+    async def send_async(self, text):
+        self.calls += 1
+        if self.calls <= self.failures:
+            if self.hang:
+                await asyncio.sleep(self.hang)
+            else:
+                raise RuntimeError("stub send failed")
+        self.sent.append((time.monotonic(), text))
+
+    def texts(self):
+        return [text for _, text in self.sent]
+
+
+def stub_send(bot, kind):
+    return bot.send if kind == 'sync' else bot.send_async
+
+
+# Wait until `condition()` holds, failing after `timeout` seconds
+async def until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the notifier"
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.parametrize('kind', ['sync', 'async'])
+def test_burst_is_coalesced_into_one_digest(kind):
+    async def check():
+        bot = StubBot()
+        notifier = Notifier(stub_send(bot, kind), min_interval=0, coalesce_delay=0.1)
+        notifier.start()
+        for i in range(5):
+            notifier.notify(f"message {i}")
+        await until(lambda: bot.sent)
+        await notifier.stop()
+        assert bot.texts() == ['\n'.join(f"message {i}" for i in range(5))]
+
+    asyncio.run(check())
+
+
+@pytest.mark.parametrize('kind', ['sync', 'async'])
+def test_digest_is_split_at_the_message_limit(kind):
+    async def check():
+        bot = StubBot()
+        notifier = Notifier(stub_send(bot, kind), min_interval=0, coalesce_delay=0.05)
+        notifier.start()
+        for message in ['a' * 2000, 'b' * 2000, 'c' * 2000, 'd' * 5000]:
+            notifier.notify(message)
+        await until(lambda: len(bot.sent) == 3)
+        await notifier.stop()
+        texts = bot.texts()
+        assert all(len(text) <= max_message_length for text in texts)
+        assert texts == ['a' * 2000 + '\n' + 'b' * 2000, 'c' * 2000, 'd' * max_message_length]
+
+    asyncio.run(check())
+
+
+def test_full_queue_reports_dropped_messages():
+    async def check():
+        bot = StubBot()
+        notifier = Notifier(bot.send, max_queue=3, min_interval=0, coalesce_delay=0)
+        for i in range(5):
+            notifier.notify(f"message {i}")
+        notifier.start()
+        await until(lambda: bot.sent)
+        await notifier.stop()
+        assert bot.texts() == ["message 0\nmessage 1\nmessage 2\n(2 notifications dropped)"]
+
+    asyncio.run(check())
+
+
+@pytest.mark.parametrize('kind', ['sync', 'async'])
+def test_sends_are_paced_by_min_interval(kind):
+    async def check():
+        bot = StubBot()
+        notifier = Notifier(stub_send(bot, kind), min_interval=0.2, coalesce_delay=0)
+        notifier.start()
+        for _ in range(3):
+            notifier.notify('x' * 4000)  # One text each
+        await until(lambda: len(bot.sent) == 3)
+        await notifier.stop()
+        times = [sent_at for sent_at, _ in bot.sent]
+        assert min(b - a for a, b in zip(times, times[1:])) >= 0.19
+
+    asyncio.run(check())
+
+
+@pytest.mark.parametrize('kind', ['sync', 'async'])
+def test_failing_send_is_logged_and_delivery_continues(kind, caplog):
+    async def check():
+        bot = StubBot(failures=1)
+        notifier = Notifier(stub_send(bot, kind), min_interval=0, coalesce_delay=0)
+        notifier.start()
+        notifier.notify('first')
+        await until(lambda: bot.calls == 1)
+        notifier.notify('second')
+        await until(lambda: bot.sent)
+        await notifier.stop()
+        assert bot.texts() == ['second']
+
+    with caplog.at_level(logging.ERROR, logger='notifier'):
+        asyncio.run(check())
+    assert "Failed to send notification: stub send failed" in caplog.text
+
+
+@pytest.mark.parametrize('kind', ['sync', 'async'])
+def test_hanging_send_is_cut_off_by_send_timeout(kind):
+    async def check():
+        bot = StubBot(failures=1, hang=1.0)
+        notifier = Notifier(stub_send(bot, kind), min_interval=0, coalesce_delay=0, send_timeout=0.1)
+        notifier.start()
+        start = time.monotonic()
+        notifier.notify('first')
+        await until(lambda: bot.calls == 1)
+        notifier.notify('second')
+        await until(lambda: 'second' in bot.texts())
+        elapsed = time.monotonic() - start
+        await notifier.stop()
+        assert elapsed < 0.9  # Delivered before the hanging send returned
+
+    asyncio.run(check())
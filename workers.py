@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+import zlib
+
+from engine import Strategy, TradingEngine, create_exchange, state_paths
+from metrics import metrics
+from scheduler import SharedBudget
+from signals import rule_sets
+
+logger = logging.getLogger(__name__)
+
+# Parameters
+default_workers = os.cpu_count()  # Worker processes scanning the pairs
+sweep_delay = 1  # Seconds between a worker's sweeps
+max_signal_age = 30  # Seconds after which a queued signal is dropped
+message_timeout = 1.0  # Seconds the coordinator waits for a message before housekeeping
+
+
+# Worker owning a pair. The hash is stable across restarts and rescreens,
+# so a pair's candle buffers, indicator state and stream subscription
+# always live in the same worker.
+def shard_of(pair, count):
+    return zlib.crc32(pair.encode()) % count
+
+
+def shard(pairs, count):
+    shards = [[] for _ in range(count)]
+    for pair in pairs:
+        shards[shard_of(pair, count)].append(pair)
+    return shards
+
+
+# One worker process: its own exchange client, market stream, candle
+# cache and indicator state for its shard. It scans the pairs the
+# coordinator assigns, skipping held ones, and sends every signal to the
+# coordinator instead of trading.
+class Worker:
+    def __init__(self, index, count, strategies, settings, budget, control, messages, exchange_factory=create_exchange):
+        self.index = index
+        self.count = count
+        self.strategies = strategies
+        self.settings = settings
+        self.budget = budget
+        self.control = control
+        self.messages = messages
+        self.exchange_factory = exchange_factory
+        self.pairs = []
+        self.held = set()
+
+    # Apply queued coordinator messages; False once told to stop
+    def drain(self):
+        while True:
+            try:
+                kind, value = self.control.get_nowait()
+            except queue.Empty:
+                return True
+            if kind == 'stop':
+                return False
+            if kind == 'pairs':
+                self.pairs = value
+            elif kind == 'held':
+                self.held = set(value)
+
+    async def run(self):
+        engine = TradingEngine(self.exchange_factory(budget=self.budget), self.strategies, **self.settings)
+        try:
+            universe = [pair for pair in await engine.get_tradeable_pairs() if shard_of(pair, self.count) == self.index]
+            if engine.snapshots is not None:
+                await engine.snapshots.restore()
+                engine.snapshots.start()
+            engine.market_stream.subscribe(universe, engine.fetched_timeframes)
+            engine.market_stream.start()
+            while self.drain():
+                pairs = [pair for pair in self.pairs if pair not in self.held]
+                if pairs:
+                    start = time.perf_counter()
+                    try:
+                        signals = await engine.scan(pairs)
+                    except Exception as e:
+                        logger.error(f"An error occurred during scanning: {e}")
+                        signals = []
+                    self.messages.put(('sweep', self.index, len(pairs), time.perf_counter() - start))
+                    for strategy, pair, action, price in signals:
+                        self.messages.put(('signal', time.time(), strategy.name, pair, action, price))
+                await asyncio.sleep(sweep_delay)
+        finally:
+            await engine.close()
+
+
+# Process entry point
+def run_worker(index, count, strategies, settings, budget, control, messages, exchange_factory):
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s [%(levelname)s] worker {index}: %(message)s')
+    try:
+        asyncio.run(Worker(index, count, strategies, settings, budget, control, messages, exchange_factory).run())
+    except KeyboardInterrupt:
+        pass
+
+
+# Sharded multi-process mode. The pairs are split across `workers`
+# processes that fetch candles, compute indicators and evaluate the
+# strategies in parallel; this process owns the balance, order
+# placement and exits, and acts on their signals one at a time. All
+# processes draw on one shared request weight budget, so together they
+# stay within the exchange's limit.
+class Coordinator:
+    def __init__(self, strategies, workers=default_workers, notifier=None, exchange_factory=create_exchange, **settings):
+        self.strategies = {strategy.name: strategy for strategy in strategies}
+        self.workers = max(1, workers)
+        self.notifier = notifier
+        self.exchange_factory = exchange_factory
+        self.settings = settings
+        self.context = multiprocessing.get_context('spawn')
+        self.budget = SharedBudget(self.context)
+        self.messages = self.context.Queue()
+        self.controls = [self.context.Queue() for _ in range(self.workers)]
+        self.processes = [None] * self.workers
+        self.engine = None
+
+    # Start worker `index`, replacing a dead one
+    def start_worker(self, index):
+        settings = {**self.settings, 'metrics_port': None, 'metrics_summary_interval': None, 'screen_pairs': False}
+        if self.engine.snapshots is not None:
+            settings['snapshot_path'] = f"{self.engine.snapshots.path}.{index}"
+        process = self.context.Process(
+            target=run_worker,
+            args=(index, self.workers, list(self.strategies.values()), settings, self.budget, self.controls[index], self.messages, self.exchange_factory),
+            daemon=True)
+        process.start()
+        self.processes[index] = process
+
+    # Act on one worker message
+    async def handle(self, message):
+        if message[0] == 'sweep':
+            _, index, count, seconds = message
+            metrics.inc('sweeps_total', worker=index)
+            metrics.inc('pairs_scanned_total', count, worker=index)
+            metrics.observe('sweep_seconds', seconds, worker=index)
+            return
+        _, sent_at, name, pair, action, price = message
+        if time.time() - sent_at > max_signal_age:
+            logger.info(f"Dropping stale {action} signal for {pair}.")
+            return
+        if not self.engine.exit_engine.holds(pair):
+            metrics.inc('signals_total', strategy=name, action=action)
+            await self.engine.execute(self.strategies[name], pair, action, price)
+
+    async def run(self):
+        engine = self.engine = TradingEngine(self.exchange_factory(budget=self.budget), list(self.strategies.values()), self.notifier, **self.settings)
+        loop = asyncio.get_running_loop()
+        try:
+            pairs = await engine.get_tradeable_pairs()  # Refreshes the markets cache the workers read
+            if engine.snapshots is not None:
+                await engine.snapshots.restore()
+                engine.snapshots.start()
+            engine.market_stream.subscribe(pairs, [])  # Prices only, for exits
+            engine.market_stream.start()
+            engine.price_service.start()
+            engine.exit_engine.start()
+            if self.notifier is not None:
+                self.notifier.start()
+            if engine.metrics_server is not None:
+                try:
+                    await engine.metrics_server.start()
+                except Exception as e:
+                    logger.error(f"Error starting the metrics server, trading without it: {e}")
+            if engine.metrics_summary_interval:
+                metrics.start(engine.metrics_summary_interval)
+            if engine.screen_pairs:
+                engine.screener.universe = pairs
+                if not engine.screener.stats:  # Not restored from a recent snapshot
+                    try:
+                        await engine.screener.refresh()
+                    except Exception as e:
+                        logger.error(f"Error screening pairs: {e}")
+                engine.screener.start()
+            for index in range(self.workers):
+                self.start_worker(index)
+            logger.info(f"Started {self.workers} workers for {len(pairs)} pairs.")
+
+            assigned = None
+            held = None
+            while True:
+                for index, process in enumerate(self.processes):
+                    if not process.is_alive():
+                        logger.error(f"Worker {index} exited with code {process.exitcode}, restarting it.")
+                        self.start_worker(index)
+                        assigned = held = None
+                current = engine.screener.pairs() if engine.screen_pairs else pairs
+                if current is not assigned:
+                    for control, shard_pairs in zip(self.controls, shard(current, self.workers)):
+                        control.put(('pairs', shard_pairs))
+                    assigned = current
+                positions = set(engine.exit_engine.positions)
+                if positions != held:
+                    for control in self.controls:
+                        control.put(('held', sorted(positions)))
+                    held = positions
+                try:
+                    message = await loop.run_in_executor(None, self.messages.get, True, message_timeout)
+                except queue.Empty:
+                    continue
+                try:
+                    await self.handle(message)
+                except Exception as e:
+                    logger.error(f"An error occurred handling a worker signal: {e}")
+        finally:
+            await self.stop()
+
+    # Stop the workers, then the coordinator's own services
+    async def stop(self):
+        loop = asyncio.get_running_loop()
+        for control in self.controls:
+            control.put(('stop', None))
+        for process in self.processes:
+            if process is not None:
+                await loop.run_in_executor(None, process.join, 10)
+                if process.is_alive():
+                    process.terminate()
+        if self.engine is not None:
+            await self.engine.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    parser = argparse.ArgumentParser(description="Scan pairs in worker processes and trade from one coordinator")
+    parser.add_argument('strategies', nargs='+', choices=sorted(rule_sets))
+    parser.add_argument('--workers', type=int, default=default_workers)
+    parser.add_argument('--timeframes', nargs='+', default=['15m'])
+    parser.add_argument('--initial-investment', type=float, default=10.0)
+    args = parser.parse_args()
+    strategies = [Strategy(name, rule_sets[name](), args.timeframes, args.initial_investment) for name in args.strategies]
+    asyncio.run(Coordinator(strategies, args.workers, **state_paths(f"workers-{'-'.join(args.strategies)}")).run())